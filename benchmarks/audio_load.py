@@ -0,0 +1,187 @@
+"""Load-test an audio worker node: start `bleedripoff.py --audio-worker`, open
+many RemoteAudioSource streams against it at once and read each one at the
+real-time pace of the voice client (one 20 ms packet per tick).
+
+The streams are read on threads of this process, as discord.py's audio
+players are in the bot, while an asyncio loop here stands in for the bot's
+gateway loop. Before and during the load it measures event-loop lag (overshoot
+of a 10 ms sleep) and the round trip of a dummy command: a client thread sends
+a line over TCP, a handler on the loop replies. Also reports connect latency,
+the share of packets that arrived after their tick, how far streams fell
+behind real time, and the CPU the worker plus its ffmpeg processes spend per
+stream (Linux, read from /proc). Needs ffmpeg on PATH.
+
+    python benchmarks/audio_load.py --streams 60 --seconds 60 --preset bassboost
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="bleed-bench-"))
+
+import bleedripoff
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stream_cpu import build_input, serve
+
+def process_cpu(pid):
+    with open(f"/proc/{pid}/stat") as file:
+        fields = file.read().rsplit(")", 1)[1].split()
+    # utime + stime of the process and of the children it has already reaped
+    return sum(int(field) for field in fields[11:15]) / os.sysconf("SC_CLK_TCK")
+
+def tree_cpu(root):
+    children = {}
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            try:
+                with open(f"/proc/{name}/stat") as file:
+                    parent = int(file.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(parent, []).append(int(name))
+    
+    total, pending = 0.0, [root]
+    while pending:
+        pid = pending.pop()
+        try:
+            total += process_cpu(pid)
+        except OSError:
+            continue
+        pending.extend(children.get(pid, ()))
+    return total
+
+def run_stream(node, request, seconds, results):
+    source = bleedripoff.RemoteAudioSource(node, request)
+    start = time.perf_counter()
+    try:
+        source.connect()
+    except OSError as e:
+        results.append((None, 0, 0, 0.0, str(e)))
+        return
+    connected = time.perf_counter() - start
+    
+    frames = late = 0
+    lag = 0.0
+    deadline = time.perf_counter()
+    for _ in range(int(seconds / 0.02)):
+        deadline += 0.02
+        if not source.read():
+            break
+        frames += 1
+        delay = deadline - time.perf_counter()
+        if delay < 0:
+            late += 1
+            lag = max(lag, -delay)
+        else:
+            time.sleep(delay)
+    source.cleanup()
+    results.append((connected, frames, late, lag, None))
+
+async def handle_command(reader, writer):
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        writer.write(b"ok " + line)
+        await writer.drain()
+    writer.close()
+
+def command_client(port, stop, samples):
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        stream = sock.makefile('rb')
+        while not stop.is_set():
+            start = time.perf_counter()
+            sock.sendall(b"ping\n")
+            stream.readline()
+            samples.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+async def measure_bot(seconds, port):
+    loop_lags, commands = [], []
+    stop = threading.Event()
+    client = threading.Thread(target=command_client, args=(port, stop, commands))
+    client.start()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        loop_lags.append(time.perf_counter() - start - 0.01)
+    stop.set()
+    await asyncio.get_running_loop().run_in_executor(None, client.join)
+    return loop_lags, commands
+
+async def run_load(args, node, request, worker):
+    server = await asyncio.start_server(handle_command, "127.0.0.1", args.command_port)
+    idle = await measure_bot(3, args.command_port)
+    
+    results = []
+    threads = [threading.Thread(target=run_stream, args=(node, request, args.seconds, results)) for _ in range(args.streams)]
+    worker_start = tree_cpu(worker.pid)
+    process_start = time.process_time()
+    for thread in threads:
+        thread.start()
+    loaded = await measure_bot(args.seconds * 0.9, args.command_port)
+    worker_cpu = tree_cpu(worker.pid) - worker_start
+    for thread in threads:
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+    client_cpu = time.process_time() - process_start
+    server.close()
+    return results, idle, loaded, worker_cpu, client_cpu
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=60)
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--preset", default="off", choices=list(bleedripoff.audio_presets))
+    parser.add_argument("--volume", type=float, default=1.0)
+    parser.add_argument("--http-port", type=int, default=8766)
+    parser.add_argument("--worker-port", type=int, default=7030)
+    parser.add_argument("--command-port", type=int, default=7031)
+    args = parser.parse_args()
+    
+    build_input(os.path.abspath("input.webm"), args.seconds + 10)
+    server = serve(os.getcwd(), args.http_port)
+    worker = subprocess.Popen([sys.executable, os.path.join(ROOT, "bleedripoff.py"), "--audio-worker", f"127.0.0.1:{args.worker_port}"])
+    try:
+        time.sleep(2)
+        options = bleedripoff.compile_audio_options(args.preset, args.volume)
+        request = {'url': f"http://127.0.0.1:{args.http_port}/input.webm", 'preset': args.preset, 'volume': args.volume,
+                   'bitrate': 128, 'codec': "copy" if options == "-vn" else "libopus", 'token': bleedripoff.audio_token}
+        node = bleedripoff.AudioNode(f"127.0.0.1:{args.worker_port}")
+        results, idle, loaded, worker_cpu, client_cpu = asyncio.run(run_load(args, node, request, worker))
+    finally:
+        worker.terminate()
+        server.kill()
+    
+    failed = [result[4] for result in results if result[4]]
+    connects = [result[0] for result in results if not result[4]]
+    lags = [result[3] for result in results if not result[4]]
+    frames = sum(result[1] for result in results)
+    late = sum(result[2] for result in results)
+    streamed = max(1, len(connects)) * args.seconds * 0.9
+    print(f"streams: {len(connects)} ok, {len(failed)} failed ({args.preset}, volume {args.volume:.0%}, codec {request['codec']})")
+    print(f"connect: p50 {percentile(connects, 0.5) * 1000:.1f} ms, p95 {percentile(connects, 0.95) * 1000:.1f} ms")
+    print(f"packets: {frames:,} read, {late / max(1, frames):.2%} after their 20 ms tick")
+    print(f"lag behind real time: p50 {percentile(lags, 0.5) * 1000:.0f} ms, p95 {percentile(lags, 0.95) * 1000:.0f} ms")
+    print(f"worker + ffmpeg cpu per stream: {worker_cpu / streamed:.2%} of a core")
+    print(f"client cpu per stream: {client_cpu / (max(1, len(connects)) * args.seconds):.2%} of a core")
+    for name, (loop_lags, commands) in (("idle", idle), ("under load", loaded)):
+        print(f"bot {name}: loop lag p50 {percentile(loop_lags, 0.5) * 1000:.2f} ms, p99 {percentile(loop_lags, 0.99) * 1000:.2f} ms, "
+              f"max {max(loop_lags, default=0) * 1000:.1f} ms; command round trip p50 {percentile(commands, 0.5) * 1000:.2f} ms, "
+              f"p99 {percentile(commands, 0.99) * 1000:.2f} ms ({len(commands)} commands)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measure what each cache policy keeps in memory for one guild of N members,
+by building the guild the way discord.py does from GUILD_CREATE with the
+intents and member cache flags build_cache_options returns. The 'full' payload
+carries every member (the state chunking reaches); 1% of members sit in voice.
+
+Also reports the cost of the message cache per cached message, which is what
+max_messages (BLEED_MESSAGE_CACHE) trades against snipe/editsnipe coverage.
+
+    python benchmarks/member_memory.py --sizes 10000 100000 500000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="bleed-bench-"))
+
+import discord
+import bleedripoff
+
+GUILD_ID = 1
+VOICE_CHANNEL_ID = 2
+TEXT_CHANNEL_ID = 3
+
+def user_payload(user_id):
+    return {'id': str(user_id), 'username': f"user{user_id}", 'global_name': f"User {user_id}",
+            'discriminator': "0", 'avatar': None}
+
+def guild_payload(size, voice_share=0.01):
+    members = [{'user': user_payload(user_id), 'roles': [], 'joined_at': "2024-01-01T00:00:00+00:00",
+                'deaf': False, 'mute': False, 'flags': 0} for user_id in range(10, size + 10)]
+    voice_states = [{'user_id': str(user_id), 'channel_id': str(VOICE_CHANNEL_ID), 'session_id': "bench",
+                     'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False, 'suppress': False}
+                    for user_id in range(10, int(size * voice_share) + 10)]
+    return {
+        'id': str(GUILD_ID), 'name': "bench", 'owner_id': "10", 'roles': [], 'emojis': [], 'stickers': [], 'features': [],
+        'member_count': size, 'members': members, 'voice_states': voice_states,
+        'channels': [
+            {'id': str(VOICE_CHANNEL_ID), 'type': 2, 'name': "voice", 'position': 0, 'bitrate': 64000, 'user_limit': 0},
+            {'id': str(TEXT_CHANNEL_ID), 'type': 0, 'name': "text", 'position': 1},
+        ],
+    }
+
+def measure_guild(policy, size):
+    client = discord.Client(**bleedripoff.build_cache_options(policy))
+    payload = guild_payload(size)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    guild = discord.Guild(data=payload, state=client._connection)
+    del payload
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used, len(guild.members)
+
+def measure_messages(count):
+    client = discord.Client(**bleedripoff.build_cache_options("lean"))
+    guild = discord.Guild(data=guild_payload(0), state=client._connection)
+    channel = guild.get_channel(TEXT_CHANNEL_ID)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    messages = deque(maxlen=count)
+    for message_id in range(count):
+        messages.append(discord.Message(state=client._connection, channel=channel, data={
+            'id': str(1000 + message_id), 'channel_id': str(TEXT_CHANNEL_ID), 'author': user_payload(10 + message_id % 500),
+            'content': "a typical chat message of around eighty characters, give or take a few words",
+            'timestamp': "2024-01-01T00:00:00+00:00", 'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+            'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'type': 0,
+        }))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 2000, 5000])
+    args = parser.parse_args()
+    
+    print(f"{'members':>10} {'policy':>6} {'cached':>9} {'memory':>10} {'per member':>11}")
+    for size in args.sizes:
+        for policy in ("lean", "full"):
+            used, cached = measure_guild(policy, size)
+            print(f"{size:>10,} {policy:>6} {cached:>9,} {used / 2**20:>7.1f} MB {used / size:>8.0f} B")
+    
+    print(f"\n{'max_messages':>12} {'memory':>10} {'per message':>12}")
+    for count in args.messages:
+        used = measure_messages(count)
+        print(f"{count:>12,} {used / 2**20:>7.2f} MB {used / count:>9.0f} B")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare prefix resolution throughput: per-message SQLite lookups (the old
+get_prefix) against the in-memory write-through cache BleedBot uses now.
+
+    python benchmarks/prefix_lookup.py --guilds 5000 --users 50000 --messages 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="bleed-bench-"))
+
+import bleedripoff
+
+def build_database(path, guilds, users):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE prefixes (guild_id INTEGER, prefix TEXT, user_id INTEGER, user_prefix TEXT)")
+    conn.executemany("INSERT INTO prefixes (guild_id, prefix) VALUES (?, ?)", ((guild_id, "!") for guild_id in range(guilds)))
+    conn.executemany("INSERT INTO prefixes (user_id, user_prefix) VALUES (?, ?)", ((user_id, "?") for user_id in range(0, users, 10)))
+    conn.commit()
+    conn.close()
+
+def uncached_prefix(path, message):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_prefix FROM prefixes WHERE user_id = ?", (message.author.id,))
+    user_prefix = cursor.fetchone()
+    if user_prefix:
+        conn.close()
+        return user_prefix[0]
+    
+    cursor.execute("SELECT prefix FROM prefixes WHERE guild_id = ?", (message.guild.id,))
+    guild_prefix = cursor.fetchone()
+    conn.close()
+    return guild_prefix[0] if guild_prefix else ";"
+
+def build_messages(count, guilds, users):
+    return [SimpleNamespace(guild=SimpleNamespace(id=random.randrange(guilds)), author=SimpleNamespace(id=random.randrange(users)))
+            for _ in range(count)]
+
+async def cached_run(messages, guilds, users):
+    cache = SimpleNamespace(guild_prefixes={guild_id: "!" for guild_id in range(guilds)},
+                            user_prefixes={user_id: "?" for user_id in range(0, users, 10)})
+    start = time.perf_counter()
+    for message in messages:
+        await bleedripoff.BleedBot.get_prefix(cache, message)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--uncached-messages", type=int, default=5000)
+    args = parser.parse_args()
+    
+    path = os.path.abspath("prefixes.db")
+    build_database(path, args.guilds, args.users)
+    
+    messages = build_messages(args.uncached_messages, args.guilds, args.users)
+    start = time.perf_counter()
+    for message in messages:
+        uncached_prefix(path, message)
+    uncached = len(messages) / (time.perf_counter() - start)
+    
+    messages = build_messages(args.messages, args.guilds, args.users)
+    cached = len(messages) / asyncio.run(cached_run(messages, args.guilds, args.users))
+    
+    print(f"per-message SQLite: {uncached:>12,.0f} messages/s")
+    print(f"in-memory cache:    {cached:>12,.0f} messages/s ({cached / uncached:,.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare rank lookups: the COUNT(*) query rank used to run against
+LevelIndex.rank, at several guild sizes. Also reports the one-off cost of
+loading the index and of applying an XP update to it.
+
+    python benchmarks/rank_lookup.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="bleed-bench-"))
+
+import bleedripoff
+
+GUILD_ID = 1
+
+def build_database(path, size):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE levels (guild_id INTEGER, user_id INTEGER, xp INTEGER, level INTEGER, PRIMARY KEY (guild_id, user_id))")
+    conn.executemany("INSERT INTO levels (guild_id, user_id, xp, level) VALUES (?, ?, ?, ?)",
+                     ((GUILD_ID, user_id, random.randrange(1_000_000), 1) for user_id in range(size)))
+    conn.execute("CREATE INDEX idx_levels_guild_xp_user ON levels (guild_id, xp, user_id)")
+    conn.commit()
+    return conn
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    
+    print(f"{'rows':>10} {'COUNT(*) rank':>15} {'index rank':>12} {'index load':>12} {'index update':>14}")
+    for size in args.sizes:
+        conn = build_database(os.path.abspath(f"levels-{size}.db"), size)
+        probes = [random.randrange(1_000_000) for _ in range(args.lookups)]
+        
+        def count_rank():
+            for xp in probes:
+                conn.execute("SELECT COUNT(*) FROM levels WHERE guild_id = ? AND xp > ?", (GUILD_ID, xp)).fetchone()
+        
+        owner = SimpleNamespace(leaderboard_cache_size=100)
+        start = time.perf_counter()
+        xps, top_rows, previous = bleedripoff.BleedBot._load_level_index(owner, conn, GUILD_ID, [])
+        index = bleedripoff.LevelIndex(owner.leaderboard_cache_size)
+        index.load(xps, top_rows, previous, {})
+        load = time.perf_counter() - start
+        
+        def index_rank():
+            for xp in probes:
+                index.rank(xp)
+        
+        def index_update():
+            for user_id, xp in enumerate(probes):
+                index.apply(user_id, index.xps[user_id % len(index.xps)], xp + 1, 1)
+        
+        sql = timed(count_rank, 1) / len(probes)
+        memory = timed(index_rank, 5) / len(probes)
+        update = timed(index_update, 1) / len(probes)
+        print(f"{size:>10,} {sql * 1e6:>12.1f} us {memory * 1e6:>9.2f} us {load * 1e3:>9.0f} ms {update * 1e6:>11.2f} us")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Drive RateTracker and CooldownStore with a million distinct keys on a
+simulated clock, evicting every eviction interval the way BleedBot's
+eviction loop does, and report how many keys each store holds and how much
+memory it uses at its peak and just after each eviction (steady state).
+
+Every event uses a new (guild, user) key, the worst case for both stores.
+
+    python benchmarks/rate_store_memory.py --keys 1000000 --rate 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="bleed-bench-"))
+
+import bleedripoff
+
+def simulate(name, store, touch, size, keys, rate, interval, clock):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    peak_keys = peak_memory = 0
+    steady = []
+    next_eviction = interval
+    for key in range(keys):
+        clock.now = key / rate
+        if clock.now >= next_eviction:
+            peak_keys = max(peak_keys, size(store))
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[0] - baseline)
+            store.evict()
+            steady.append((size(store), tracemalloc.get_traced_memory()[0] - baseline))
+            next_eviction += interval
+        touch(store, (key % 1000, key))
+    peak_keys = max(peak_keys, size(store))
+    peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[0] - baseline)
+    tracemalloc.stop()
+    
+    steady_keys = max(count for count, _ in steady) if steady else peak_keys
+    steady_memory = max(memory for _, memory in steady) if steady else peak_memory
+    print(f"{name:<14} {peak_keys:>10,} {peak_memory / 2**20:>9.1f} MB {steady_keys:>12,} {steady_memory / 2**20:>9.1f} MB {len(steady):>10}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--rate", type=float, default=1000, help="new keys per simulated second")
+    parser.add_argument("--window", type=float, default=60, help="RateTracker window and cooldown length")
+    parser.add_argument("--interval", type=float, default=300, help="eviction interval")
+    args = parser.parse_args()
+    
+    # The stores read time.monotonic() through the module, so a fake clock drives them
+    clock = SimpleNamespace(now=0.0)
+    bleedripoff.time = SimpleNamespace(monotonic=lambda: clock.now)
+    
+    print(f"{args.keys:,} keys at {args.rate:,.0f}/s ({args.keys / args.rate:,.0f} simulated seconds), "
+          f"window {args.window:.0f}s, eviction every {args.interval:.0f}s")
+    print(f"{'store':<14} {'peak keys':>10} {'peak memory':>12} {'steady keys':>12} {'steady memory':>12} {'evictions':>10}")
+    simulate("RateTracker", bleedripoff.RateTracker(args.window), lambda store, key: store.hit(key),
+             lambda store: len(store.entries), args.keys, args.rate, args.interval, clock)
+    simulate("CooldownStore", bleedripoff.CooldownStore(args.window), lambda store, key: store.try_acquire(key),
+             lambda store: len(store.expiry), args.keys, args.rate, args.interval, clock)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Measure the CPU one music stream costs in each playback mode: the Opus stream
+copy and PCMVolumeTransformer sources MusicPlayer.build_source produces, and an
+ffmpeg libopus re-encode (what audio worker nodes run for filtered streams).
+
+Each source is drained as fast as ffmpeg allows from a generated Opus/WebM file
+served over local HTTP (build_source's reconnect options are HTTP-only), and the
+CPU spent (ffmpeg plus the Python side) is divided by the audio length,
+giving the share of one core a real-time stream keeps busy. Needs ffmpeg on PATH.
+
+    python benchmarks/stream_cpu.py --duration 120
+"""
+import argparse
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="bleed-bench-"))
+
+import discord
+import bleedripoff
+
+def build_input(path, duration):
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi",
+                    "-i", f"anoisesrc=color=pink:amplitude=0.2:duration={duration}", "-ac", "2", "-ar", "48000",
+                    "-c:a", "libopus", "-b:a", "128k", path], check=True)
+
+def serve(directory, port):
+    server = subprocess.Popen([sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1"], cwd=directory,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("HTTP server did not start")
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def drain(source, encoder):
+    frames = 0
+    while True:
+        data = source.read()
+        if not data:
+            break
+        if encoder is not None and not source.is_opus():
+            encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+        frames += 1
+    source.cleanup()
+    return frames
+
+def measure(source_factory, encoder):
+    process_start = time.process_time()
+    children_start = children_cpu()
+    frames = drain(source_factory(), encoder)
+    cpu = (time.process_time() - process_start) + (children_cpu() - children_start)
+    if not frames:
+        raise RuntimeError("ffmpeg produced no audio")
+    return cpu / (frames * 0.02)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=int, default=120)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--opus", help="path to libopus if discord.py cannot find it")
+    args = parser.parse_args()
+    
+    build_input(os.path.abspath("input.webm"), args.duration)
+    server = serve(os.getcwd(), args.port)
+    url = f"http://127.0.0.1:{args.port}/input.webm"
+    
+    if args.opus:
+        discord.opus.load_opus(args.opus)
+    try:
+        encoder = discord.opus.Encoder()
+    except discord.opus.OpusNotLoaded:
+        encoder = None
+    
+    def player_source(preset, volume):
+        player = bleedripoff.MusicPlayer(SimpleNamespace(), 0)
+        player.current = {'codec': "opus", 'bitrate': 128}
+        player.preset = preset
+        player.volume = volume
+        return lambda: player.build_source(url)
+    
+    def libopus_source(preset, volume):
+        options = bleedripoff.compile_audio_options(preset, volume)
+        return lambda: discord.FFmpegOpusAudio(url, bitrate=128, codec=None, options=options)
+    
+    modes = [
+        ("player, volume 100% (copy)", player_source("off", 1.0)),
+        ("player, volume 50% (pcm)", player_source("off", 0.5)),
+        ("player, bassboost (pcm)", player_source("bassboost", 1.0)),
+        ("ffmpeg libopus, volume 50%", libopus_source("off", 0.5)),
+        ("ffmpeg libopus, bassboost", libopus_source("bassboost", 1.0)),
+    ]
+    
+    print(f"{'mode':<30} {'cpu per stream':>16}")
+    try:
+        for name, factory in modes:
+            share = measure(factory, encoder)
+            print(f"{name:<30} {share * 100:>13.2f} %")
+    finally:
+        server.kill()
+    if encoder is None:
+        print("libopus could not be loaded, so the pcm rows exclude the in-process Opus encode")
+
+if __name__ == "__main__":
+    main()
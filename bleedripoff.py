@@ -1,23 +1,1136 @@
 import discord
 from discord.ext import commands
 import asyncio
+import heapq
+import hmac
 import json
 import os
 import sqlite3
 import aiohttp
+from aiohttp import web
 import youtube_dl
 from datetime import datetime, timedelta
 import re
 import random
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+import shlex
+import socket
 import string
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, wraps
+from typing import Optional
 
-intents = discord.Intents.all()
+cache_policy = os.environ.get("BLEED_CACHE_POLICY", "lean")
+message_cache_size = int(os.environ.get("BLEED_MESSAGE_CACHE", 1000))
 
-class BleedBot(commands.Bot):
+def build_cache_options(policy):
+    if policy not in ("lean", "full"):
+        raise ValueError(f"Unknown cache policy {policy!r}, expected 'lean' or 'full'")
+    
+    if policy == "full":
+        return {
+            'intents': discord.Intents.all(),
+            'member_cache_flags': discord.MemberCacheFlags.all(),
+            'chunk_guilds_at_startup': True,
+            'max_messages': message_cache_size,
+        }
+    
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
+    return {
+        'intents': intents,
+        'member_cache_flags': member_cache_flags,
+        'chunk_guilds_at_startup': False,
+        'max_messages': message_cache_size,
+    }
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+    
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q):
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+class Metrics:
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+    
+    def inc(self, name, labels=(), amount=1):
+        series = self.counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+    
+    def observe(self, name, labels, value):
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self.BUCKETS)
+        histogram.observe(value)
+    
+    def gauge(self, name, func):
+        self.gauges[name] = func
+    
+    @staticmethod
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    
+    def format_labels(self, labels, extra=()):
+        pairs = [f'{key}="{self.escape(value)}"' for key, value in (*labels, *extra)]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    @staticmethod
+    def format_value(value):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+    
+    def render(self):
+        lines = []
+        for name, series in self.counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{self.format_labels(labels)} {value}")
+        
+        for name, series in self.histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self.format_labels(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{self.format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{self.format_labels(labels)} {self.format_value(histogram.sum)}")
+                lines.append(f"{name}_count{self.format_labels(labels)} {histogram.count}")
+        
+        for name, func in self.gauges.items():
+            try:
+                value = func()
+            except Exception as e:
+                print(f"Failed to collect {name}: {e}")
+                continue
+            
+            lines.append(f"# TYPE {name} gauge")
+            series = value if isinstance(value, dict) else {(): value}
+            for labels, sample in series.items():
+                lines.append(f"{name}{self.format_labels(labels)} {self.format_value(sample)}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def build_http_trace():
+    trace = aiohttp.TraceConfig()
+    
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+    
+    async def on_request_end(session, context, params):
+        labels = (("method", params.method), ("status", params.response.status))
+        metrics.observe("bleed_rest_request_seconds", labels, time.perf_counter() - context.start)
+    
+    async def on_request_exception(session, context, params):
+        metrics.inc("bleed_rest_errors_total", (("method", params.method),))
+    
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+class Database:
+    def __init__(self, path):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bleed-db")
+        self.conn = self.executor.submit(self._connect).result()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=512)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, func, self.conn, *args)
+        finally:
+            metrics.observe("bleed_db_seconds", (("operation", func.__name__.lstrip("_")),), time.perf_counter() - start)
+    
+    @staticmethod
+    def _execute(conn, query, params):
+        with conn:
+            return conn.execute(query, params).rowcount
+    
+    @staticmethod
+    def _insert(conn, query, params):
+        with conn:
+            return conn.execute(query, params).lastrowid
+    
+    @staticmethod
+    def _executemany(conn, query, seq_of_params):
+        with conn:
+            return conn.executemany(query, seq_of_params).rowcount
+    
+    @staticmethod
+    def _fetchone(conn, query, params):
+        return conn.execute(query, params).fetchone()
+    
+    @staticmethod
+    def _fetchall(conn, query, params):
+        return conn.execute(query, params).fetchall()
+    
+    @staticmethod
+    def _schema_version(conn):
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    @staticmethod
+    def _apply_migration(conn, version, migration):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                conn.rollback()
+                return False
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            return True
+        except:
+            conn.rollback()
+            raise
+    
+    async def execute(self, query, params=()):
+        return await self.run(self._execute, query, params)
+    
+    async def insert(self, query, params=()):
+        return await self.run(self._insert, query, params)
+    
+    async def executemany(self, query, seq_of_params):
+        return await self.run(self._executemany, query, list(seq_of_params))
+    
+    async def fetchone(self, query, params=()):
+        return await self.run(self._fetchone, query, params)
+    
+    async def fetchall(self, query, params=()):
+        return await self.run(self._fetchall, query, params)
+    
+    async def migrate(self, migrations):
+        current = await self.run(self._schema_version)
+        for version, migration in enumerate(migrations, 1):
+            if version > current and await self.run(self._apply_migration, version, migration):
+                print(f"Applied database migration {version}: {migration.__name__}")
+    
+    def close(self):
+        self.executor.submit(self.conn.close).result()
+        self.executor.shutdown(wait=True)
+
+class AutoResponderMatcher:
+    MODES = ("contains", "exact", "word", "startswith", "regex")
+    REGEX_PATTERN_LIMIT = 100
+    REGEX_INPUT_LIMIT = 1000
+    REPEATS = tuple(getattr(sre_parse, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") if hasattr(sre_parse, name))
+    ALPHABET = frozenset(chr(code) for code in range(0x250)) | frozenset("ΑαЖж中日😀\u2003\u3000")
+    CATEGORIES = {
+        sre_parse.CATEGORY_DIGIT: str.isdecimal,
+        sre_parse.CATEGORY_NOT_DIGIT: lambda char: not char.isdecimal(),
+        sre_parse.CATEGORY_SPACE: str.isspace,
+        sre_parse.CATEGORY_NOT_SPACE: lambda char: not char.isspace(),
+        sre_parse.CATEGORY_WORD: lambda char: char.isalnum() or char == "_",
+        sre_parse.CATEGORY_NOT_WORD: lambda char: not (char.isalnum() or char == "_"),
+    }
+    
+    def __init__(self, rows):
+        self.responses = []
+        self.exact = {}
+        self.regexes = []
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        
+        for index, (trigger, response, mode) in enumerate(rows):
+            self.responses.append(response)
+            lowered = trigger.lower()
+            if mode == "exact":
+                self.exact.setdefault(lowered.strip(), index)
+            elif mode == "regex":
+                if self.check_regex(trigger) is None:
+                    self.regexes.append((index, re.compile(trigger, re.IGNORECASE)))
+            elif lowered:
+                self.add_pattern(lowered, index, mode)
+        
+        self.build()
+    
+    @classmethod
+    def check_regex(cls, pattern):
+        if len(pattern) > cls.REGEX_PATTERN_LIMIT:
+            return f"Regex triggers can be at most {cls.REGEX_PATTERN_LIMIT} characters"
+        try:
+            tree = sre_parse.parse(pattern, re.IGNORECASE)
+        except re.error as e:
+            return f"Invalid regex: {e}"
+        alphabet = cls.ALPHABET | {variant for char in pattern for variant in cls.fold(char)}
+        if cls.has_unsafe_repeat(tree, False, alphabet):
+            return "Regex triggers can't use backreferences, nested quantifiers, quantified alternations, or back-to-back quantifiers that can match the same characters"
+        return None
+    
+    @classmethod
+    def char_set(cls, tree, alphabet):
+        # Every character (from a sample alphabet plus the pattern's own) the subtree could consume
+        chars = set()
+        for op, value in tree:
+            if op is sre_parse.LITERAL:
+                chars.update(cls.fold(chr(value)))
+            elif op is sre_parse.NOT_LITERAL:
+                chars.update(char for char in alphabet if chr(value) not in cls.fold(char))
+            elif op is sre_parse.ANY:
+                chars.update(alphabet - {"\n"})
+            elif op is sre_parse.IN:
+                chars.update(char for char in alphabet if cls.in_class(value, char))
+            elif op in cls.REPEATS:
+                chars |= cls.char_set(value[2], alphabet)
+            elif op is sre_parse.SUBPATTERN:
+                chars |= cls.char_set(value[-1], alphabet)
+            elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+                chars |= cls.char_set(value, alphabet)
+            elif op is sre_parse.BRANCH:
+                for branch in value[1]:
+                    chars |= cls.char_set(branch, alphabet)
+        return frozenset(chars)
+    
+    @staticmethod
+    def fold(char):
+        return {variant for variant in (char, char.lower(), char.upper()) if len(variant) == 1}
+    
+    @classmethod
+    def in_class(cls, items, char):
+        variants = cls.fold(char)
+        negate = False
+        for op, value in items:
+            if op is sre_parse.NEGATE:
+                negate = True
+            elif op is sre_parse.LITERAL and chr(value) in variants:
+                return not negate
+            elif op is sre_parse.RANGE and any(value[0] <= ord(variant) <= value[1] for variant in variants):
+                return not negate
+            elif op is sre_parse.CATEGORY and value in cls.CATEGORIES and any(map(cls.CATEGORIES[value], variants)):
+                return not negate
+            elif op is sre_parse.CATEGORY and value not in cls.CATEGORIES:
+                return True
+        return negate
+    
+    @classmethod
+    def flatten(cls, tree):
+        for op, value in tree:
+            if op is sre_parse.SUBPATTERN:
+                yield from cls.flatten(value[-1])
+            elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+                yield from cls.flatten(value)
+            else:
+                yield op, value
+    
+    @classmethod
+    def has_ambiguous_run(cls, tree, alphabet):
+        # Two variable-length repeats that can both consume some character, with nothing in between
+        # that must consume a different one (a*a*, \s*x?\s*, \w*_\w*), let the engine try every split
+        # between them, which is polynomial in the input per extra repeat.
+        live = frozenset()
+        for op, value in cls.flatten(tree):
+            if op in cls.REPEATS:
+                low, high, body = value
+                chars = cls.char_set(body, alphabet)
+                if high > low:
+                    if live & chars:
+                        return True
+                    live = chars if low else live | chars
+                elif low:
+                    live &= chars
+            elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN):
+                live &= cls.char_set([(op, value)], alphabet)
+        return False
+    
+    @classmethod
+    def has_unsafe_repeat(cls, tree, repeated, alphabet):
+        if cls.has_ambiguous_run(tree, alphabet):
+            return True
+        for op, value in tree:
+            if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+                return True
+            if op in cls.REPEATS:
+                low, high, body = value
+                unbounded = high > 1
+                if unbounded and repeated:
+                    return True
+                if cls.has_unsafe_repeat(body, repeated or unbounded, alphabet):
+                    return True
+            elif op is sre_parse.BRANCH:
+                if repeated:
+                    return True
+                if any(cls.has_unsafe_repeat(branch, repeated, alphabet) for branch in value[1]):
+                    return True
+            elif op is sre_parse.SUBPATTERN:
+                if cls.has_unsafe_repeat(value[-1], repeated, alphabet):
+                    return True
+            elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+                if cls.has_unsafe_repeat(value, repeated, alphabet):
+                    return True
+            elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                if cls.has_unsafe_repeat(value[1], repeated, alphabet):
+                    return True
+        return False
+    
+    def add_pattern(self, pattern, index, mode):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((index, len(pattern), mode))
+    
+    def build(self):
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+                queue.append(next_state)
+    
+    @staticmethod
+    def is_boundary(text, start, end):
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_")
+    
+    def match(self, content):
+        text = content.lower()
+        best = self.exact.get(text.strip())
+        
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            
+            for index, length, mode in self.output[state]:
+                if best is not None and index >= best:
+                    continue
+                start = position - length + 1
+                if mode == "startswith" and start != 0:
+                    continue
+                if mode == "word" and not self.is_boundary(text, start, position + 1):
+                    continue
+                best = index
+        
+        content = content[:self.REGEX_INPUT_LIMIT]
+        for index, pattern in self.regexes:
+            if best is not None and index >= best:
+                break
+            if pattern.search(content):
+                best = index
+                break
+        
+        return None if best is None else self.responses[best]
+
+class AliasTrie:
+    def __init__(self, rows):
+        self.root = {}
+        self.commands = {}
+        for shortcut, command in rows:
+            self.commands[shortcut] = command
+            node = self.root
+            for char in shortcut:
+                node = node.setdefault(char, {})
+            node[None] = shortcut
+    
+    def longest_match(self, text):
+        node = self.root
+        match = None
+        for position, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node and (position + 1 == len(text) or text[position + 1].isspace()):
+                match = node[None]
+        return match
+    
+    def expand(self, text, max_depth):
+        seen = set()
+        for _ in range(max_depth):
+            shortcut = self.longest_match(text)
+            if shortcut is None or shortcut in seen:
+                break
+            seen.add(shortcut)
+            text = self.commands[shortcut] + text[len(shortcut):]
+        return text
+
+class SlidingWindow:
+    __slots__ = ("events", "last_seen")
+    
+    def __init__(self, maxlen):
+        self.events = deque(maxlen=maxlen)
+        self.last_seen = 0.0
+
+class RateTracker:
+    def __init__(self, window, maxlen=64):
+        self.window = window
+        self.maxlen = maxlen
+        self.entries = {}
+    
+    def hit(self, key):
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = SlidingWindow(self.maxlen)
+        
+        events = entry.events
+        cutoff = now - self.window
+        while events and events[0] <= cutoff:
+            events.popleft()
+        
+        events.append(now)
+        entry.last_seen = now
+        return len(events)
+    
+    def evict(self):
+        cutoff = time.monotonic() - self.window
+        self.entries = {key: entry for key, entry in self.entries.items() if entry.last_seen > cutoff}
+
+class CooldownStore:
+    def __init__(self, duration):
+        self.duration = duration
+        self.expiry = {}
+    
+    def try_acquire(self, key):
+        now = time.monotonic()
+        if self.expiry.get(key, 0.0) > now:
+            return False
+        self.expiry[key] = now + self.duration
+        return True
+    
+    def evict(self):
+        now = time.monotonic()
+        self.expiry = {key: expires for key, expires in self.expiry.items() if expires > now}
+
+class AntiNukeConfig:
+    __slots__ = ("limits", "whitelist")
+    
+    def __init__(self, limits, whitelist):
+        self.limits = limits
+        self.whitelist = whitelist
+
+class MusicSettings:
+    __slots__ = ("dj_role_id", "autoplay")
+    
+    def __init__(self, dj_role_id=None, autoplay=False):
+        self.dj_role_id = dj_role_id
+        self.autoplay = bool(autoplay)
+
+class LevelIndex:
+    def __init__(self, top_size):
+        self.top_size = top_size
+        self.xps = array('q')
+        self.top = {}
+        self.backlog = []
+        self.loaded = False
+        self.ready = asyncio.Event()
+    
+    def load(self, xps, top_rows, previous, overrides):
+        self.xps = xps
+        self.top = {user_id: (xp, level) for user_id, xp, level in top_rows}
+        for user_id, (xp, level) in overrides.items():
+            self.apply(user_id, previous.get(user_id), xp, level)
+        for update in self.backlog:
+            self.apply(*update)
+        self.backlog = []
+        self.loaded = True
+        self.ready.set()
+    
+    def update(self, user_id, old_xp, new_xp, level):
+        if self.loaded:
+            self.apply(user_id, old_xp, new_xp, level)
+        else:
+            self.backlog.append((user_id, old_xp, new_xp, level))
+    
+    def apply(self, user_id, old_xp, new_xp, level):
+        if old_xp is not None:
+            position = bisect_left(self.xps, old_xp)
+            if position < len(self.xps) and self.xps[position] == old_xp:
+                del self.xps[position]
+        insort(self.xps, new_xp)
+        
+        if user_id in self.top or len(self.top) < self.top_size or (new_xp, user_id) > self.top_floor():
+            self.top[user_id] = (new_xp, level)
+            if len(self.top) > self.top_size:
+                del self.top[min(self.top, key=lambda top_user_id: (self.top[top_user_id][0], top_user_id))]
+    
+    def top_floor(self):
+        return min((xp, user_id) for user_id, (xp, _) in self.top.items())
+    
+    def __len__(self):
+        return len(self.xps)
+    
+    def rank(self, xp):
+        return len(self.xps) - bisect_right(self.xps, xp) + 1
+    
+    def xp_at(self, position):
+        return self.xps[len(self.xps) - 1 - position]
+    
+    def count_above(self, xp):
+        return len(self.xps) - bisect_right(self.xps, xp)
+    
+    def page(self, start, size):
+        if start + size > len(self.top) and len(self.top) < len(self.xps):
+            return None
+        ordered = sorted(self.top.items(), key=lambda item: (item[1][0], item[0]), reverse=True)
+        return [(user_id, xp, level) for user_id, (xp, level) in ordered[start:start + size]]
+
+class TimerScheduler:
+    def __init__(self, bot, batch_size=50):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.heap = []
+        self.handlers = {}
+        self.wakeup = asyncio.Event()
+    
+    def handler(self, kind):
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+    
+    async def load(self):
+        rows = await self.bot.db.fetchall("SELECT due, id, kind, guild_id, channel_id, target_id FROM timers")
+        self.heap = [tuple(row) for row in rows if self.bot.owns_guild(row[3])]
+        heapq.heapify(self.heap)
+        self.wakeup.set()
+    
+    async def schedule(self, delay, kind, guild_id, channel_id=None, target_id=None):
+        due = time.time() + delay
+        timer_id = await self.bot.db.insert("INSERT INTO timers (due, kind, guild_id, channel_id, target_id) VALUES (?, ?, ?, ?, ?)", 
+                                            (due, kind, guild_id, channel_id, target_id))
+        entry = (due, timer_id, kind, guild_id, channel_id, target_id)
+        heapq.heappush(self.heap, entry)
+        if self.heap[0] is entry:
+            self.wakeup.set()
+        return timer_id
+    
+    async def cancel(self, kind, guild_id, target_id):
+        remaining = [entry for entry in self.heap if entry[2:4] != (kind, guild_id) or entry[5] != target_id]
+        if len(remaining) != len(self.heap):
+            heapq.heapify(remaining)
+            self.heap = remaining
+        await self.bot.db.execute("DELETE FROM timers WHERE kind = ? AND guild_id = ? AND target_id = ?", 
+                                  (kind, guild_id, target_id))
+    
+    async def fire(self, entry):
+        due, timer_id, kind, guild_id, channel_id, target_id = entry
+        handler = self.handlers.get(kind)
+        if handler is None:
+            return print(f"No handler for timer {timer_id} ({kind})")
+        
+        try:
+            await handler(guild_id, channel_id, target_id)
+        except Exception as e:
+            print(f"Timer {timer_id} ({kind}) failed: {e}")
+    
+    async def run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            
+            now = time.time()
+            delay = self.heap[0][0] - now
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            batch = []
+            while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self.heap))
+            await asyncio.gather(*(self.fire(entry) for entry in batch))
+            await self.bot.db.executemany("DELETE FROM timers WHERE id = ?", [(entry[1],) for entry in batch])
+
+class GreetingTemplate:
+    __slots__ = ("parts",)
+    
+    def __init__(self, message):
+        self.parts = re.split(r"(\{user\}|\{server\})", message)
+    
+    def render(self, values):
+        return "".join(values.get(part, part) for part in self.parts)
+
+class GreetingAggregator:
+    def __init__(self, bot, table, verb, threshold=5, window=10, digest_delay=10, raid_cooldown=300):
+        self.bot = bot
+        self.table = table
+        self.verb = verb
+        self.threshold = threshold
+        self.digest_delay = digest_delay
+        self.configs = {}
+        self.rates = RateTracker(window)
+        self.raid_alerts = CooldownStore(raid_cooldown)
+        self.pending = {}
+        self.raid_hooks = []
+    
+    def on_raid(self, func):
+        self.raid_hooks.append(func)
+        return func
+    
+    async def get_config(self, guild_id):
+        config = self.configs.get(guild_id)
+        if config is None:
+            rows = await self.bot.db.fetchall(f"SELECT channel_id, message, self_destruct FROM {self.table} WHERE guild_id = ?", (guild_id,))
+            config = [(channel_id, GreetingTemplate(message), self_destruct) for channel_id, message, self_destruct in rows]
+            self.configs[guild_id] = config
+        return config
+    
+    async def send(self, guild, content):
+        sends = []
+        for channel_id, template, self_destruct in await self.get_config(guild.id):
+            channel = guild.get_channel(channel_id)
+            if channel:
+                text = content if isinstance(content, str) else template.render(content)
+                sends.append((self.bot.outbound.send(channel, content=text), self_destruct))
+        
+        for future, self_destruct in sends:
+            msg = await future
+            if msg and self_destruct:
+                await self.bot.timers.schedule(self_destruct, "self_destruct", guild.id, msg.channel.id, msg.id)
+    
+    async def dispatch(self, guild, member, user):
+        if not await self.get_config(guild.id):
+            return
+        
+        count = self.rates.hit(guild.id)
+        if count <= self.threshold and guild.id not in self.pending:
+            return await self.send(guild, {"{user}": user, "{server}": guild.name})
+        
+        pending = self.pending.get(guild.id)
+        if pending is None:
+            pending = self.pending[guild.id] = []
+            asyncio.create_task(self.flush(guild))
+            if self.raid_alerts.try_acquire(guild.id):
+                for hook in self.raid_hooks:
+                    try:
+                        await hook(guild, count)
+                    except Exception as e:
+                        print(f"Raid hook {hook.__name__} failed: {e}")
+        pending.append((str(member), user))
+    
+    async def flush(self, guild):
+        await asyncio.sleep(self.digest_delay)
+        members = self.pending.pop(guild.id, [])
+        if len(members) == 1:
+            return await self.send(guild, {"{user}": members[0][1], "{server}": guild.name})
+        
+        names = ", ".join(name for name, _ in members[:10])
+        if len(members) > 10:
+            names += f" and {len(members) - 10} more"
+        await self.send(guild, f"**{len(members)} members {self.verb}** {guild.name}: {names}")
+
+class BulkOverwriteJob:
+    def __init__(self, guild, target, overwrite, concurrency=5):
+        self.guild = guild
+        self.target = target
+        self.overwrite = overwrite
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.total = len(guild.channels)
+        self.done = 0
+        self.skipped = 0
+        self.failed = []
+    
+    def plan(self):
+        categories, channels, synced = [], [], []
+        for channel in self.guild.channels:
+            if channel.overwrites_for(self.target) == self.overwrite:
+                self.skipped += 1
+            elif isinstance(channel, discord.CategoryChannel):
+                categories.append(channel)
+            elif channel.category and channel.permissions_synced:
+                synced.append(channel)
+            else:
+                channels.append(channel)
+        return categories, channels, synced
+    
+    async def apply(self, channel, sync=False):
+        async with self.semaphore:
+            try:
+                if sync:
+                    await channel.edit(sync_permissions=True)
+                else:
+                    await channel.set_permissions(self.target, overwrite=self.overwrite)
+                self.done += 1
+            except discord.HTTPException as e:
+                print(f"Failed to update permissions in {channel.id}: {e}")
+                self.failed.append(channel)
+    
+    async def run(self):
+        categories, channels, synced = self.plan()
+        await asyncio.gather(*(self.apply(category) for category in categories))
+        
+        failed = set(self.failed)
+        await asyncio.gather(*(self.apply(channel) for channel in channels),
+                             *(self.apply(channel, sync=channel.category not in failed) for channel in synced))
+
+class OutboundMessage:
+    __slots__ = ("priority", "seq", "kind", "kwargs", "futures", "queued_at", "ready_at")
+    
+    def __init__(self, priority, seq, kind, kwargs, future, ready_at):
+        self.priority = priority
+        self.seq = seq
+        self.kind = kind
+        self.kwargs = kwargs
+        self.futures = [future]
+        self.queued_at = time.monotonic()
+        self.ready_at = ready_at
+
+class ChannelQueue:
+    def __init__(self, channel):
+        self.channel = channel
+        self.items = []
+        self.coalescing = {}
+        self.wakeup = asyncio.Event()
+        self.worker = None
+        self.latency = None
+        self.dropped = 0
+        self.last_used = time.monotonic()
+
+class OutboundDispatcher:
+    ALERT, NORMAL, LOW = 0, 1, 2
+    
+    def __init__(self, coalesce_window=2.0, max_depth=20):
+        self.coalesce_window = coalesce_window
+        self.max_depth = max_depth
+        self.channels = {}
+        self.mergers = {}
+        self.seq = 0
+    
+    def merger(self, kind):
+        def decorator(func):
+            self.mergers[kind] = func
+            return func
+        return decorator
+    
+    def send(self, channel, priority=NORMAL, kind=None, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        queue = self.channels.get(channel.id)
+        if queue is None:
+            queue = self.channels[channel.id] = ChannelQueue(channel)
+        queue.last_used = now = time.monotonic()
+        
+        pending = queue.coalescing.get(kind)
+        if pending is not None:
+            pending.kwargs = self.mergers[kind](pending.kwargs, kwargs)
+            pending.futures.append(future)
+            return future
+        
+        if len(queue.items) >= self.max_depth and not self.make_room(queue, priority):
+            queue.dropped += 1
+            future.set_result(None)
+            return future
+        
+        self.seq += 1
+        ready_at = now + self.coalesce_window if kind in self.mergers else now
+        item = OutboundMessage(priority, self.seq, kind, kwargs, future, ready_at)
+        queue.items.append(item)
+        if kind in self.mergers:
+            queue.coalescing[kind] = item
+        
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self.drain(queue))
+        else:
+            queue.wakeup.set()
+        return future
+    
+    def make_room(self, queue, priority):
+        if priority == self.ALERT:
+            return True
+        
+        victim = max(queue.items, key=lambda item: (item.priority, item.seq))
+        if victim.priority <= priority:
+            return False
+        
+        queue.items.remove(victim)
+        if queue.coalescing.get(victim.kind) is victim:
+            del queue.coalescing[victim.kind]
+        for future in victim.futures:
+            future.set_result(None)
+        queue.dropped += 1
+        return True
+    
+    async def drain(self, queue):
+        while queue.items:
+            now = time.monotonic()
+            ready = [item for item in queue.items if item.ready_at <= now]
+            if not ready:
+                queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), min(item.ready_at for item in queue.items) - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            item = min(ready, key=lambda item: (item.priority, item.seq))
+            queue.items.remove(item)
+            if queue.coalescing.get(item.kind) is item:
+                del queue.coalescing[item.kind]
+            
+            try:
+                message = await queue.channel.send(**item.kwargs)
+            except discord.HTTPException as e:
+                print(f"Failed to send message in {queue.channel.id}: {e}")
+                message = None
+            
+            latency = time.monotonic() - item.queued_at
+            queue.latency = latency if queue.latency is None else queue.latency * 0.8 + latency * 0.2
+            for future in item.futures:
+                if not future.done():
+                    future.set_result(message)
+    
+    def depth(self):
+        return sum(len(queue.items) for queue in self.channels.values())
+    
+    def stats(self):
+        return {channel_id: {"depth": len(queue.items), "latency": queue.latency, "dropped": queue.dropped} 
+                for channel_id, queue in self.channels.items()}
+    
+    def evict(self, max_idle):
+        cutoff = time.monotonic() - max_idle
+        self.channels = {channel_id: queue for channel_id, queue in self.channels.items() 
+                         if queue.items or queue.last_used > cutoff}
+
+class ClusterHub:
+    def __init__(self):
+        self.clients = {}
+    
+    async def handle(self, reader, writer):
+        cluster_id = None
+        try:
+            cluster_id = json.loads(await reader.readline())['cluster']
+            self.clients[cluster_id] = writer
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                
+                message = json.loads(line)
+                if message['op'] == "reply":
+                    targets = [self.clients.get(message['to'])]
+                else:
+                    targets = [client for other, client in self.clients.items() if other != cluster_id]
+                
+                for target in targets:
+                    if target:
+                        target.write(line)
+                        await target.drain()
+        except (ConnectionError, json.JSONDecodeError, KeyError) as e:
+            print(f"Cluster {cluster_id} IPC error: {e}")
+        finally:
+            if self.clients.get(cluster_id) is writer:
+                del self.clients[cluster_id]
+            writer.close()
+
+class ClusterClient:
+    def __init__(self, cluster_id, cluster_count, address, timeout=5):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.address = address
+        self.timeout = timeout
+        self.handlers = {}
+        self.pending = {}
+        self.nonce = 0
+        self.writer = None
+        self.listener = None
+    
+    def handler(self, event):
+        def decorator(func):
+            self.handlers[event] = func
+            return func
+        return decorator
+    
+    async def connect(self):
+        reader, self.writer = await asyncio.open_connection(*self.address)
+        await self.write({'cluster': self.cluster_id})
+        self.listener = asyncio.create_task(self.listen(reader))
+    
+    async def write(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        await self.writer.drain()
+    
+    async def publish(self, event, data):
+        await self.write({'op': "publish", 'event': event, 'data': data})
+    
+    async def request(self, event, data=None):
+        results = [await self.handlers[event](data)]
+        if self.cluster_count == 1:
+            return results
+        
+        self.nonce += 1
+        nonce = self.nonce
+        future = asyncio.get_running_loop().create_future()
+        self.pending[nonce] = (future, results)
+        try:
+            await self.write({'op': "request", 'event': event, 'data': data, 'from': self.cluster_id, 'nonce': nonce})
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            del self.pending[nonce]
+        return results
+    
+    async def listen(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            
+            message = json.loads(line)
+            try:
+                if message['op'] == "publish":
+                    await self.handlers[message['event']](message['data'])
+                elif message['op'] == "request":
+                    reply = await self.handlers[message['event']](message['data'])
+                    await self.write({'op': "reply", 'to': message['from'], 'nonce': message['nonce'], 'data': reply})
+                elif message['op'] == "reply" and message['nonce'] in self.pending:
+                    future, results = self.pending[message['nonce']]
+                    results.append(message['data'])
+                    if len(results) >= self.cluster_count and not future.done():
+                        future.set_result(results)
+            except Exception as e:
+                print(f"Failed to handle IPC {message.get('op')} {message.get('event')}: {e}")
+    
+    def close(self):
+        if self.listener:
+            self.listener.cancel()
+        if self.writer:
+            self.writer.close()
+
+class SnipedMessage:
+    __slots__ = ("author_id", "content", "timestamp")
+    
+    def __init__(self, author_id, content, timestamp):
+        self.author_id = author_id
+        self.content = content
+        self.timestamp = timestamp
+
+class SnipeCache:
+    def __init__(self, depth, max_age, max_channels):
+        self.depth = depth
+        self.max_age = max_age
+        self.max_channels = max_channels
+        self.channels = OrderedDict()
+    
+    def add(self, channel_id, message_type, entry):
+        buffers = self.channels.get(channel_id)
+        if buffers is None:
+            buffers = self.channels[channel_id] = {}
+            if len(self.channels) > self.max_channels:
+                self.channels.popitem(last=False)
+        else:
+            self.channels.move_to_end(channel_id)
+        
+        buffer = buffers.get(message_type)
+        if buffer is None:
+            buffer = buffers[message_type] = deque(maxlen=self.depth)
+        buffer.append(entry)
+    
+    def get(self, channel_id, message_type):
+        buffer = self.channels.get(channel_id, {}).get(message_type)
+        if not buffer:
+            return []
+        cutoff = datetime.now() - timedelta(seconds=self.max_age)
+        return [entry for entry in reversed(buffer) if entry.timestamp >= cutoff]
+    
+    def clear(self, channel_id):
+        self.channels.pop(channel_id, None)
+    
+    def evict(self):
+        cutoff = datetime.now() - timedelta(seconds=self.max_age)
+        for channel_id in list(self.channels):
+            buffers = self.channels[channel_id]
+            for message_type in list(buffers):
+                buffer = buffers[message_type]
+                while buffer and buffer[0].timestamp < cutoff:
+                    buffer.popleft()
+                if not buffer:
+                    del buffers[message_type]
+            if not buffers:
+                del self.channels[channel_id]
+
+class StarEntry:
+    __slots__ = ("count", "embed", "channel_name", "post_id")
+    
+    def __init__(self, count, embed, channel_name, post_id):
+        self.count = count
+        self.embed = embed
+        self.channel_name = channel_name
+        self.post_id = post_id
+
+class BleedBot(commands.AutoShardedBot):
     def __init__(self):
-        super().__init__(command_prefix=self.get_prefix, intents=intents, help_command=None)
+        super().__init__(command_prefix=self.get_prefix, help_command=None, http_trace=build_http_trace(), 
+                         **build_cache_options(cache_policy))
+        self.cluster = None
+        self.metrics_port = 9108
+        self.metrics_runner = None
         self.db_path = "bleed_bot.db"
-        self.init_database()
+        self.db = Database(self.db_path)
+        self.migrations = [self.create_tables, self.add_keys_and_indexes, self.split_prefixes,
+                           self.add_autoresponder_match_mode, self.create_antinuke_tables,
+                           self.add_leaderboard_index, self.create_starboard_posts, self.create_timers,
+                           self.strip_alias_prefixes]
+        self.guild_prefixes = {}
+        self.user_prefixes = {}
+        self.autoresponders = {}
+        self.aliases = {}
+        self.alias_depth = 5
         self.action_limits = {
             'channel_delete': 3,
             'channel_create': 5,
@@ -26,12 +1139,142 @@ class BleedBot(commands.Bot):
             'ban': 3,
             'kick': 5
         }
+        self.antinuke_actions = {
+            discord.AuditLogAction.channel_delete: 'channel_delete',
+            discord.AuditLogAction.channel_create: 'channel_create',
+            discord.AuditLogAction.role_delete: 'role_delete',
+            discord.AuditLogAction.role_create: 'role_create',
+            discord.AuditLogAction.ban: 'ban',
+            discord.AuditLogAction.kick: 'kick'
+        }
+        self.antinuke_configs = {}
         self.action_timeframe = 60
-        self.user_actions = {}
-        self.cooldowns = {}
+        self.user_actions = RateTracker(self.action_timeframe)
+        self.cooldowns = CooldownStore(60)
+        self.antinuke_punished = CooldownStore(self.action_timeframe)
+        self.eviction_interval = 300
+        self.eviction_task = None
+        self.xp_pending = {}
+        self.xp_flush_interval = 30
+        self.xp_flush_threshold = 500
+        self.xp_flush_lock = asyncio.Lock()
+        self.xp_flush_task = None
+        self.level_indexes = {}
+        self.leaderboard_cache_size = 100
+        self.leaderboard_page_size = 10
+        self.snipes = SnipeCache(depth=25, max_age=7200, max_channels=5000)
+        self.snipe_persist = False
+        self.snipe_pending = []
+        self.starboard_configs = {}
+        self.music_settings = {}
+        self.stars = OrderedDict()
+        self.star_cache_size = 10000
+        self.star_locks = {}
+        self.timers = TimerScheduler(self)
+        self.outbound = OutboundDispatcher()
+        self.welcomes = GreetingAggregator(self, "welcome_messages", "joined")
+        self.goodbyes = GreetingAggregator(self, "goodbye_messages", "left")
+        self.timer_task = None
+        
+    async def setup_hook(self):
+        await self.init_database()
+        await self.load_prefixes()
+        if self.snipe_persist:
+            await self.load_snipes()
+        self.xp_flush_task = asyncio.create_task(self.xp_flush_loop())
+        self.eviction_task = asyncio.create_task(self.eviction_loop())
+        await self.timers.load()
+        self.timer_task = asyncio.create_task(self.timers.run())
+        if self.cluster:
+            await self.cluster.connect()
+        self.register_gauges()
+        if self.metrics_port:
+            await self.start_metrics_server()
+    
+    def event(self, coro):
+        labels = (("event", coro.__name__),)
+        
+        @wraps(coro)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await coro(*args, **kwargs)
+            except Exception:
+                metrics.inc("bleed_event_errors_total", labels)
+                raise
+            finally:
+                metrics.observe("bleed_event_seconds", labels, time.perf_counter() - start)
+        return super().event(wrapper)
+    
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
         
-    def init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        labels = (("command", ctx.command.qualified_name),)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            metrics.observe("bleed_command_seconds", labels, time.perf_counter() - start)
+            if ctx.command_failed:
+                metrics.inc("bleed_command_errors_total", labels)
+    
+    def register_gauges(self):
+        metrics.gauge("bleed_guilds", lambda: len(self.guilds))
+        metrics.gauge("bleed_gateway_latency_seconds", lambda: self.latency)
+        metrics.gauge("bleed_outbound_queue_depth", self.outbound.depth)
+        metrics.gauge("bleed_outbound_channel_depth", lambda: self.outbound_gauge("depth"))
+        metrics.gauge("bleed_outbound_channel_latency_seconds", lambda: self.outbound_gauge("latency"))
+        metrics.gauge("bleed_outbound_channel_dropped", lambda: self.outbound_gauge("dropped"))
+        metrics.gauge("bleed_pending_timers", lambda: len(self.timers.heap))
+        metrics.gauge("bleed_music_players", lambda: {(("state", state),): count for state, count in music_players.stats().items() if state != "players"})
+        metrics.gauge("bleed_audio_node_streams", lambda: {(("node", node),): streams for node, streams in audio_nodes.stats().items()})
+    
+    def outbound_gauge(self, field):
+        return {(("channel", channel_id),): stats[field] for channel_id, stats in self.outbound.stats().items() 
+                if stats[field] is not None}
+    
+    async def start_metrics_server(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.serve_metrics)
+        self.metrics_runner = web.AppRunner(app, access_log=None)
+        await self.metrics_runner.setup()
+        port = self.metrics_port + (self.cluster.cluster_id if self.cluster else 0)
+        await web.TCPSite(self.metrics_runner, "127.0.0.1", port).start()
+    
+    async def serve_metrics(self, request):
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+    
+    def configure_cluster(self, cluster_id, cluster_count, shard_ids, shard_count, address):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.cluster = ClusterClient(cluster_id, cluster_count, address)
+        self.cluster.handlers.update({"user_prefix": self.apply_user_prefix, "stats": self.local_stats})
+    
+    def owns_guild(self, guild_id):
+        return self.shard_ids is None or (guild_id >> 22) % self.shard_count in self.shard_ids
+    
+    async def local_stats(self, data=None):
+        return {
+            'cluster': self.cluster.cluster_id if self.cluster else 0,
+            'shards': len(self.shards),
+            'guilds': len(self.guilds),
+            'latency': self.latency,
+            'players': len(music_players),
+            'commands': sum(histogram.count for histogram in metrics.histograms.get("bleed_command_seconds", {}).values()),
+            'errors': sum(metrics.counters.get("bleed_command_errors_total", {}).values()),
+            'queue_depth': self.outbound.depth(),
+        }
+    
+    async def cluster_stats(self):
+        if self.cluster is None:
+            return [await self.local_stats()]
+        return await self.cluster.request("stats")
+    
+    async def init_database(self):
+        await self.db.migrate(self.migrations)
+    
+    def create_tables(self, conn):
         cursor = conn.cursor()
         
         cursor.execute('''CREATE TABLE IF NOT EXISTS prefixes
@@ -72,53 +1315,272 @@ class BleedBot(commands.Bot):
         
         cursor.execute('''CREATE TABLE IF NOT EXISTS voicemaster
                          (guild_id INTEGER, category_id INTEGER, channel_id INTEGER)''')
-        
-        conn.commit()
-        conn.close()
     
-    async def get_prefix(self, message):
-        if not message.guild:
-            return ";"
+    def rebuild_table(self, conn, table, columns, key):
+        conn.execute(f"CREATE TABLE {table}_new ({columns}, PRIMARY KEY ({key}))")
+        conn.execute(f"INSERT INTO {table}_new SELECT * FROM {table} WHERE rowid IN (SELECT MAX(rowid) FROM {table} GROUP BY {key})")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    
+    def add_keys_and_indexes(self, conn):
+        self.rebuild_table(conn, "moderation", "guild_id INTEGER, staff_role_id INTEGER, mute_role_id INTEGER", "guild_id")
+        self.rebuild_table(conn, "welcome_messages", "guild_id INTEGER, channel_id INTEGER, message TEXT, self_destruct INTEGER", "guild_id, channel_id")
+        self.rebuild_table(conn, "goodbye_messages", "guild_id INTEGER, channel_id INTEGER, message TEXT, self_destruct INTEGER", "guild_id, channel_id")
+        self.rebuild_table(conn, "boost_messages", "guild_id INTEGER, channel_id INTEGER, message TEXT, self_destruct INTEGER", "guild_id, channel_id")
+        self.rebuild_table(conn, "aliases", "guild_id INTEGER, shortcut TEXT, command TEXT", "guild_id, shortcut")
+        self.rebuild_table(conn, "music_settings", "guild_id INTEGER, dj_role_id INTEGER, autoplay BOOLEAN", "guild_id")
+        self.rebuild_table(conn, "autoresponders", "guild_id INTEGER, trigger TEXT, response TEXT", "guild_id, trigger")
+        self.rebuild_table(conn, "levels", "guild_id INTEGER, user_id INTEGER, xp INTEGER, level INTEGER", "guild_id, user_id")
+        self.rebuild_table(conn, "starboard", "guild_id INTEGER, channel_id INTEGER, threshold INTEGER", "guild_id")
+        self.rebuild_table(conn, "counters", "guild_id INTEGER, counter_type TEXT, channel_id INTEGER, count INTEGER", "guild_id, counter_type")
+        self.rebuild_table(conn, "voicemaster", "guild_id INTEGER, category_id INTEGER, channel_id INTEGER", "guild_id")
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_levels_guild_xp ON levels (guild_id, xp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sniped_channel_time ON sniped_messages (guild_id, channel_id, timestamp)")
+    
+    def split_prefixes(self, conn):
+        conn.execute("CREATE TABLE user_prefixes (user_id INTEGER PRIMARY KEY, prefix TEXT NOT NULL)")
+        conn.execute("INSERT OR REPLACE INTO user_prefixes (user_id, prefix) SELECT user_id, user_prefix FROM prefixes WHERE user_id IS NOT NULL AND user_prefix IS NOT NULL ORDER BY rowid")
+        conn.execute("CREATE TABLE guild_prefixes (guild_id INTEGER PRIMARY KEY, prefix TEXT NOT NULL)")
+        conn.execute("INSERT INTO guild_prefixes (guild_id, prefix) SELECT guild_id, prefix FROM prefixes WHERE prefix IS NOT NULL")
+        conn.execute("DROP TABLE prefixes")
+        conn.execute("ALTER TABLE guild_prefixes RENAME TO prefixes")
+    
+    def add_autoresponder_match_mode(self, conn):
+        conn.execute("ALTER TABLE autoresponders ADD COLUMN match_mode TEXT NOT NULL DEFAULT 'contains'")
+    
+    def create_antinuke_tables(self, conn):
+        conn.execute('''CREATE TABLE antinuke_limits
+                        (guild_id INTEGER, action TEXT, threshold INTEGER, PRIMARY KEY (guild_id, action))''')
+        conn.execute('''CREATE TABLE antinuke_whitelist
+                        (guild_id INTEGER, user_id INTEGER, PRIMARY KEY (guild_id, user_id))''')
+    
+    def add_leaderboard_index(self, conn):
+        conn.execute("DROP INDEX IF EXISTS idx_levels_guild_xp")
+        conn.execute("CREATE INDEX idx_levels_guild_xp_user ON levels (guild_id, xp, user_id)")
+    
+    def create_starboard_posts(self, conn):
+        conn.execute('''CREATE TABLE starboard_posts
+                        (message_id INTEGER PRIMARY KEY, guild_id INTEGER, post_id INTEGER)''')
+    
+    def create_timers(self, conn):
+        conn.execute('''CREATE TABLE timers
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, due REAL, kind TEXT, guild_id INTEGER, 
+                         channel_id INTEGER, target_id INTEGER)''')
+        conn.execute("CREATE INDEX idx_timers_target ON timers (kind, guild_id, target_id)")
+    
+    def strip_alias_prefixes(self, conn):
+        prefixes = dict(conn.execute("SELECT guild_id, prefix FROM prefixes").fetchall())
+        rows = conn.execute("SELECT guild_id, shortcut, command FROM aliases ORDER BY rowid").fetchall()
+        conn.execute("DELETE FROM aliases")
+        for guild_id, shortcut, command in rows:
+            prefix = prefixes.get(guild_id, ";")
+            if shortcut.startswith(prefix):
+                shortcut = shortcut[len(prefix):]
+            if command.startswith(prefix):
+                command = command[len(prefix):]
+            if shortcut:
+                conn.execute("INSERT OR REPLACE INTO aliases (guild_id, shortcut, command) VALUES (?, ?, ?)", (guild_id, shortcut, command))
+    
+    async def close(self):
+        await music_players.close()
+        await super().close()
+        for task in (self.xp_flush_task, self.eviction_task, self.timer_task):
+            if task:
+                task.cancel()
+        await self.flush_xp()
+        await self.flush_snipes()
+        if self.cluster:
+            self.cluster.close()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        self.db.close()
+    
+    async def load_prefixes(self):
+        self.guild_prefixes = dict(await self.db.fetchall("SELECT guild_id, prefix FROM prefixes"))
+        self.user_prefixes = dict(await self.db.fetchall("SELECT user_id, prefix FROM user_prefixes"))
+    
+    async def set_guild_prefix(self, guild_id, prefix):
+        await self.db.execute("INSERT OR REPLACE INTO prefixes (guild_id, prefix) VALUES (?, ?)", (guild_id, prefix))
+        self.guild_prefixes[guild_id] = prefix
+    
+    async def set_user_prefix(self, user_id, prefix):
+        await self.db.execute("INSERT OR REPLACE INTO user_prefixes (user_id, prefix) VALUES (?, ?)", (user_id, prefix))
+        self.user_prefixes[user_id] = prefix
+        if self.cluster:
+            await self.cluster.publish("user_prefix", {'user_id': user_id, 'prefix': prefix})
+    
+    async def apply_user_prefix(self, data):
+        self.user_prefixes[data['user_id']] = data['prefix']
+    
+    async def get_autoresponder(self, guild_id):
+        matcher = self.autoresponders.get(guild_id)
+        if matcher is None:
+            rows = await self.db.fetchall("SELECT trigger, response, match_mode FROM autoresponders WHERE guild_id = ? ORDER BY rowid", (guild_id,))
+            matcher = AutoResponderMatcher(rows)
+            self.autoresponders[guild_id] = matcher
+        return matcher
+    
+    async def get_aliases(self, guild_id):
+        aliases = self.aliases.get(guild_id)
+        if aliases is None:
+            rows = await self.db.fetchall("SELECT shortcut, command FROM aliases WHERE guild_id = ?", (guild_id,))
+            aliases = AliasTrie(rows)
+            self.aliases[guild_id] = aliases
+        return aliases
+    
+    async def get_starboard_config(self, guild_id):
+        if guild_id not in self.starboard_configs:
+            self.starboard_configs[guild_id] = await self.db.fetchone("SELECT channel_id, threshold FROM starboard WHERE guild_id = ?", (guild_id,))
+        return self.starboard_configs[guild_id]
+    
+    @asynccontextmanager
+    async def star_lock(self, message_id):
+        # Reactions on one message are handled one at a time so two events at the threshold
+        # cannot both send a post, and two uncached events cannot both fetch the message.
+        slot = self.star_locks.get(message_id)
+        if slot is None:
+            slot = self.star_locks[message_id] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self.star_locks[message_id]
+    
+    async def load_star_entry(self, payload):
+        channel = self.get_channel(payload.channel_id)
+        if not channel:
+            return None
         
-        cursor.execute("SELECT user_prefix FROM prefixes WHERE user_id = ?", (message.author.id,))
-        user_prefix = cursor.fetchone()
-        if user_prefix:
-            conn.close()
-            return user_prefix[0]
+        message = await channel.fetch_message(payload.message_id)
+        count = next((reaction.count for reaction in message.reactions if str(reaction.emoji) == "⭐"), 0)
         
-        cursor.execute("SELECT prefix FROM prefixes WHERE guild_id = ?", (message.guild.id,))
-        guild_prefix = cursor.fetchone()
-        conn.close()
+        embed = discord.Embed(description=message.content, color=0xffd700, timestamp=message.created_at)
+        embed.set_author(name=message.author.display_name, icon_url=message.author.display_avatar.url)
+        embed.add_field(name="Source", value=f"[Jump to message]({message.jump_url})", inline=False)
         
-        return guild_prefix[0] if guild_prefix else ";"
+        if message.attachments:
+            embed.set_image(url=message.attachments[0].url)
+        
+        post = await self.db.fetchone("SELECT post_id FROM starboard_posts WHERE message_id = ?", (payload.message_id,))
+        
+        entry = StarEntry(count, embed, channel.name, post[0] if post else None)
+        self.stars[payload.message_id] = entry
+        if len(self.stars) > self.star_cache_size:
+            self.stars.popitem(last=False)
+        return entry
+    
+    async def update_star_post(self, guild_id, message_id, entry, starboard_channel, threshold):
+        entry.embed.set_footer(text=f"⭐ {entry.count} | #{entry.channel_name}")
+        
+        if entry.post_id:
+            try:
+                await starboard_channel.get_partial_message(entry.post_id).edit(embed=entry.embed)
+                return
+            except discord.NotFound:
+                entry.post_id = None
+                await self.db.execute("DELETE FROM starboard_posts WHERE message_id = ?", (message_id,))
+        
+        if entry.count >= threshold:
+            post = await starboard_channel.send(embed=entry.embed)
+            entry.post_id = post.id
+            await self.db.execute("INSERT OR REPLACE INTO starboard_posts (message_id, guild_id, post_id) VALUES (?, ?, ?)", 
+                                  (message_id, guild_id, post.id))
     
-    def track_action(self, user_id, action_type):
-        now = datetime.now()
-        if user_id not in self.user_actions:
-            self.user_actions[user_id] = {}
+    async def get_prefix(self, message):
+        if not message.guild:
+            return ";"
         
-        if action_type not in self.user_actions[user_id]:
-            self.user_actions[user_id][action_type] = []
+        user_prefix = self.user_prefixes.get(message.author.id)
+        if user_prefix:
+            return user_prefix
         
-        self.user_actions[user_id][action_type] = [
-            timestamp for timestamp in self.user_actions[user_id][action_type]
-            if now - timestamp < timedelta(seconds=self.action_timeframe)
-        ]
+        return self.guild_prefixes.get(message.guild.id, ";")
+    
+    def track_action(self, guild_id, user_id, action_type, limits=None):
+        count = self.user_actions.hit((guild_id, user_id, action_type))
+        return count > (limits or self.action_limits).get(action_type, 10)
+    
+    async def get_antinuke_config(self, guild_id):
+        config = self.antinuke_configs.get(guild_id)
+        if config is None:
+            limits = dict(self.action_limits)
+            limits.update(await self.db.fetchall("SELECT action, threshold FROM antinuke_limits WHERE guild_id = ?", (guild_id,)))
+            whitelist = {user_id for user_id, in await self.db.fetchall("SELECT user_id FROM antinuke_whitelist WHERE guild_id = ?", (guild_id,))}
+            config = AntiNukeConfig(limits, whitelist)
+            self.antinuke_configs[guild_id] = config
+        return config
+    
+    async def get_music_settings(self, guild_id):
+        settings = self.music_settings.get(guild_id)
+        if settings is None:
+            row = await self.db.fetchone("SELECT dj_role_id, autoplay FROM music_settings WHERE guild_id = ?", (guild_id,))
+            settings = MusicSettings(*row) if row else MusicSettings()
+            self.music_settings[guild_id] = settings
+        return settings
+    
+    async def save_music_settings(self, guild_id, settings):
+        await self.db.execute("INSERT OR REPLACE INTO music_settings (guild_id, dj_role_id, autoplay) VALUES (?, ?, ?)", 
+                              (guild_id, settings.dj_role_id, settings.autoplay))
+        self.music_settings[guild_id] = settings
+    
+    async def eviction_loop(self):
+        while True:
+            await asyncio.sleep(self.eviction_interval)
+            self.user_actions.evict()
+            self.cooldowns.evict()
+            self.antinuke_punished.evict()
+            self.outbound.evict(self.eviction_interval)
+            for greetings in (self.welcomes, self.goodbyes):
+                greetings.rates.evict()
+                greetings.raid_alerts.evict()
+            self.snipes.evict()
+            try:
+                await self.flush_snipes()
+            except sqlite3.Error as e:
+                print(f"Failed to flush snipes: {e}")
+    
+    def add_snipe(self, guild_id, channel_id, author_id, content, message_type):
+        entry = SnipedMessage(author_id, content, datetime.now())
+        self.snipes.add(channel_id, message_type, entry)
+        if self.snipe_persist:
+            self.snipe_pending.append((guild_id, channel_id, author_id, content, str(entry.timestamp), message_type))
+    
+    async def load_snipes(self):
+        cutoff = datetime.now() - timedelta(seconds=self.snipes.max_age)
+        rows = await self.db.fetchall("SELECT channel_id, author_id, content, timestamp, message_type FROM sniped_messages WHERE timestamp >= ? ORDER BY timestamp", 
+                                      (str(cutoff),))
+        for channel_id, author_id, content, timestamp, message_type in rows:
+            self.snipes.add(channel_id, message_type, SnipedMessage(author_id, content, datetime.fromisoformat(timestamp)))
+    
+    async def flush_snipes(self):
+        if not self.snipe_persist:
+            return
         
-        self.user_actions[user_id][action_type].append(now)
+        batch, self.snipe_pending = self.snipe_pending, []
+        if batch:
+            await self.db.executemany("INSERT INTO sniped_messages (guild_id, channel_id, author_id, content, timestamp, message_type) VALUES (?, ?, ?, ?, ?, ?)", 
+                                      batch)
         
-        return len(self.user_actions[user_id][action_type]) > self.action_limits.get(action_type, 10)
+        cutoff = datetime.now() - timedelta(seconds=self.snipes.max_age)
+        await self.db.execute("DELETE FROM sniped_messages WHERE timestamp < ?", (str(cutoff),))
     
-    def add_xp(self, guild_id, user_id, xp_amount):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    async def get_xp(self, guild_id, user_id):
+        pending = self.xp_pending.get((guild_id, user_id))
+        if pending:
+            return pending
         
-        cursor.execute("SELECT xp, level FROM levels WHERE guild_id = ? AND user_id = ?", 
-                       (guild_id, user_id))
-        result = cursor.fetchone()
+        return await self.db.fetchone("SELECT xp, level FROM levels WHERE guild_id = ? AND user_id = ?", 
+                                      (guild_id, user_id))
+    
+    def pending_xp(self, guild_id):
+        return {user_id: totals for (pending_guild_id, user_id), totals in self.xp_pending.items() if pending_guild_id == guild_id}
+    
+    async def add_xp(self, guild_id, user_id, xp_amount):
+        result = await self.get_xp(guild_id, user_id)
         
         if result:
             current_xp, current_level = result
@@ -130,13 +1592,70 @@ class BleedBot(commands.Bot):
         new_level = self.calculate_level(new_xp)
         level_up = new_level > current_level
         
-        cursor.execute("INSERT OR REPLACE INTO levels (guild_id, user_id, xp, level) VALUES (?, ?, ?, ?)", 
-                       (guild_id, user_id, new_xp, new_level))
-        conn.commit()
-        conn.close()
+        self.xp_pending[(guild_id, user_id)] = (new_xp, new_level)
+        index = self.level_indexes.get(guild_id)
+        if index is not None:
+            index.update(user_id, result[0] if result else None, new_xp, new_level)
+        if len(self.xp_pending) >= self.xp_flush_threshold and not self.xp_flush_lock.locked():
+            asyncio.create_task(self.flush_xp())
         
         return level_up, new_level
     
+    async def flush_xp(self):
+        async with self.xp_flush_lock:
+            if not self.xp_pending:
+                return
+            
+            batch = dict(self.xp_pending)
+            await self.db.executemany('''INSERT INTO levels (guild_id, user_id, xp, level) VALUES (?, ?, ?, ?)
+                                         ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = excluded.xp, level = excluded.level''', 
+                                      [(guild_id, user_id, xp, level) for (guild_id, user_id), (xp, level) in batch.items()])
+            
+            for key, totals in batch.items():
+                if self.xp_pending.get(key) is totals:
+                    del self.xp_pending[key]
+    
+    def _load_level_index(self, conn, guild_id, user_ids):
+        xps = array('q', (xp for xp, in conn.execute("SELECT xp FROM levels WHERE guild_id = ? ORDER BY xp", (guild_id,))))
+        top_rows = conn.execute("SELECT user_id, xp, level FROM levels WHERE guild_id = ? ORDER BY xp DESC, user_id DESC LIMIT ?", 
+                                (guild_id, self.leaderboard_cache_size)).fetchall()
+        
+        previous = {}
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            previous.update(conn.execute(f"SELECT user_id, xp FROM levels WHERE guild_id = ? AND user_id IN ({', '.join('?' * len(chunk))})", 
+                                         (guild_id, *chunk)).fetchall())
+        
+        return xps, top_rows, previous
+    
+    async def get_level_index(self, guild_id):
+        index = self.level_indexes.get(guild_id)
+        if index is not None:
+            await index.ready.wait()
+            return index
+        
+        index = self.level_indexes[guild_id] = LevelIndex(self.leaderboard_cache_size)
+        try:
+            async with self.xp_flush_lock:
+                overrides = self.pending_xp(guild_id)
+                index.backlog.clear()
+                xps, top_rows, previous = await self.db.run(self._load_level_index, guild_id, list(overrides))
+        except:
+            del self.level_indexes[guild_id]
+            index.ready.set()
+            raise
+        
+        index.load(xps, top_rows, previous, overrides)
+        return index
+    
+    async def xp_flush_loop(self):
+        while True:
+            await asyncio.sleep(self.xp_flush_interval)
+            try:
+                await self.flush_xp()
+            except sqlite3.Error as e:
+                print(f"Failed to flush XP: {e}")
+    
     def calculate_level(self, xp):
         return int((xp / 100) ** 0.5) + 1
     
@@ -145,23 +1664,712 @@ class BleedBot(commands.Bot):
 
 bot = BleedBot()
 
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        
+        expires, value = item
+        if expires <= time.monotonic():
+            del self.entries[key]
+            return None
+        
+        self.entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value, ttl=None):
+        self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+class TrackResolver:
+    VIDEO_URL = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/)|youtu\.be/)([\w-]{11})")
+    
+    def __init__(self, workers=4, timeout=20):
+        self.timeout = timeout
+        self.options = {
+            'format': 'bestaudio/best',
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'socket_timeout': 10,
+        }
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bleed-ytdl")
+        self.local = threading.local()
+        self.inflight = {}
+        self.searches = TTLCache(maxsize=4096, ttl=6 * 3600)
+        self.metadata = TTLCache(maxsize=4096, ttl=24 * 3600)
+        self.streams = TTLCache(maxsize=1024, ttl=3600)
+        self.related_cache = TTLCache(maxsize=2048, ttl=6 * 3600)
+        self.related_limit = 8
+    
+    def _extract(self, target):
+        ytdl = getattr(self.local, "ytdl", None)
+        if ytdl is None:
+            ytdl = self.local.ytdl = youtube_dl.YoutubeDL(self.options)
+        
+        info = ytdl.extract_info(target, download=False)
+        if 'entries' in info:
+            entries = [entry for entry in info['entries'] if entry]
+            if not entries:
+                raise LookupError("No results found")
+            info = entries[0]
+        return info
+    
+    def _extract_related(self, track):
+        ytdl = getattr(self.local, "flat", None)
+        if ytdl is None:
+            ytdl = self.local.flat = youtube_dl.YoutubeDL(dict(self.options, extract_flat='in_playlist'))
+        
+        info = ytdl.extract_info(f"ytsearch{self.related_limit}:{track['title']}", download=False)
+        return info.get('entries') or []
+    
+    async def extract(self, target):
+        future = self.inflight.get(target)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self._extract, target)
+            self.inflight[target] = future
+            future.add_done_callback(lambda _: self.inflight.pop(target, None))
+        
+        info = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        return self.store(info)
+    
+    def store(self, info):
+        track = {
+            'id': info['id'],
+            'title': info['title'],
+            'duration': info.get('duration', 0),
+            'webpage_url': info.get('webpage_url') or info['id'],
+        }
+        self.metadata.set(track['id'], track)
+        if info.get('related_videos'):
+            self.related_cache.set(track['id'], self.to_tracks(info['related_videos'], track['id']))
+        
+        expire = re.search(r"[?&]expire=(\d+)", info['url'])
+        ttl = int(expire.group(1)) - time.time() - 300 if expire else None
+        if ttl is None or ttl > 0:
+            self.streams.set(track['id'], info['url'], ttl)
+        return track
+    
+    async def search(self, query):
+        query = query.strip()
+        if re.match(r"https?://", query):
+            # Video IDs and most URL paths are case-sensitive, so URLs are keyed as given
+            # (or by the video ID when it can be read straight out of the URL).
+            match = self.VIDEO_URL.search(query)
+            key = target = query
+            video_id = match.group(1) if match else self.searches.get(key)
+        else:
+            key = query.lower()
+            target = f"ytsearch:{query}"
+            video_id = self.searches.get(key)
+        track = self.metadata.get(video_id) if video_id else None
+        
+        if track is None:
+            track = await self.extract(target)
+            self.searches.set(key, track['id'])
+        return track
+    
+    def to_tracks(self, entries, exclude=None):
+        tracks = []
+        for entry in entries:
+            if not entry or not entry.get('id') or entry['id'] == exclude:
+                continue
+            tracks.append({
+                'id': entry['id'],
+                'title': entry.get('title') or entry['id'],
+                'duration': entry.get('duration') or 0,
+                'webpage_url': entry.get('webpage_url') or f"https://www.youtube.com/watch?v={entry['id']}",
+            })
+        return tracks
+    
+    async def related(self, track):
+        tracks = self.related_cache.get(track['id'])
+        if tracks is None:
+            key = f"related:{track['id']}"
+            future = self.inflight.get(key)
+            if future is None:
+                future = asyncio.get_running_loop().run_in_executor(self.executor, self._extract_related, track)
+                self.inflight[key] = future
+                future.add_done_callback(lambda _: self.inflight.pop(key, None))
+            
+            entries = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            tracks = self.to_tracks(entries, track['id'])
+            self.related_cache.set(track['id'], tracks)
+        return tracks
+    
+    async def stream_url(self, track):
+        url = self.streams.get(track['id'])
+        if url is None:
+            await self.extract(track['webpage_url'])
+            url = self.streams.get(track['id'])
+        if url is None:
+            raise LookupError(f"No playable stream for {track['title']}")
+        return url
+
+audio_presets = {
+    'off': ("", 1.0),
+    'soft': ("lowpass=f=4000,acompressor=threshold=-20dB:ratio=3", 1.0),
+    'bassboost': ("bass=g=10,acompressor=threshold=-12dB:ratio=4", 1.0),
+    'treble': ("treble=g=6", 1.0),
+    'vaporwave': ("aresample=48000,asetrate=38400,aresample=48000", 0.8),
+    'nightcore': ("aresample=48000,asetrate=60000,aresample=48000", 1.25),
+    'karaoke': ("pan=stereo|c0=c0-c1|c1=c1-c0", 1.0),
+    '8d': ("apulsator=hz=0.125", 1.0),
+    'vibrato': ("vibrato=f=6.5:d=0.5", 1.0),
+}
+
+@lru_cache(maxsize=256)
+def compile_audio_options(preset, volume):
+    filters = [audio_presets[preset][0]] if audio_presets[preset][0] else []
+    if volume is not None and volume != 1.0:
+        filters.append(f"volume={volume:.2f}")
+    
+    if not filters:
+        return "-vn"
+    return f'-vn -filter:a "{",".join(filters)}"'
+
+async def read_ogg_packets(stream):
+    packet = b""
+    while True:
+        try:
+            header = await stream.readexactly(27)
+        except asyncio.IncompleteReadError:
+            return
+        if header[:4] != b"OggS":
+            raise ValueError("Invalid Ogg page")
+        
+        segments = await stream.readexactly(header[26])
+        body = await stream.readexactly(sum(segments))
+        offset = 0
+        for length in segments:
+            packet += body[offset:offset + length]
+            offset += length
+            if length < 255:
+                if packet and not packet.startswith((b"OpusHead", b"OpusTags")):
+                    yield packet
+                packet = b""
+
+class AudioWorker:
+    def __init__(self, host, port, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.streams = 0
+    
+    def build_args(self, request):
+        # Requests carry plain values only; every ffmpeg argument is built here, so a client
+        # can't add outputs or read local files.
+        if self.token and not hmac.compare_digest(str(request.get('token', "")), self.token):
+            raise ValueError("bad token")
+        url = request['url']
+        if not isinstance(url, str) or not re.match(r"https?://", url):
+            raise ValueError("url must be http(s)")
+        preset = request.get('preset', "off")
+        if preset not in audio_presets:
+            raise ValueError(f"unknown preset {preset!r}")
+        position = float(request.get('position', 0.0))
+        volume = float(request.get('volume', 1.0))
+        if not (0.0 <= position < 86400 and 0.0 <= volume <= 2.0):
+            raise ValueError("position or volume out of range")
+        bitrate = min(max(int(request.get('bitrate', 128)), 8), 512)
+        
+        options = compile_audio_options(preset, round(volume, 2))
+        codec = "copy" if request.get('codec') == "copy" and options == "-vn" else "libopus"
+        args = ['-protocol_whitelist', 'http,https,tcp,tls', '-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+        if position:
+            args += ['-ss', f"{position:.2f}"]
+        args += ['-i', url, '-map_metadata', '-1', '-f', 'opus', '-c:a', codec,
+                 '-ar', '48000', '-ac', '2', '-b:a', f"{bitrate}k", '-loglevel', 'warning']
+        return args + shlex.split(options) + ['pipe:1']
+    
+    async def handle(self, reader, writer):
+        process = None
+        self.streams += 1
+        try:
+            args = self.build_args(json.loads(await reader.readline()))
+            process = await asyncio.create_subprocess_exec('ffmpeg', *args, stdout=asyncio.subprocess.PIPE)
+            
+            async for packet in read_ogg_packets(process.stdout):
+                writer.write(len(packet).to_bytes(2, 'big') + packet)
+                await writer.drain()
+            writer.write(b"\0\0")
+            await writer.drain()
+        except (ConnectionError, ValueError, TypeError, KeyError, asyncio.IncompleteReadError) as e:
+            print(f"Audio stream ended early: {e}")
+        finally:
+            self.streams -= 1
+            if process and process.returncode is None:
+                process.kill()
+                await process.wait()
+            writer.close()
+    
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"Audio worker listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+class AudioNode:
+    def __init__(self, address, retry_after=30):
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.streams = 0
+        self.lock = threading.Lock()
+        self.retry_after = retry_after
+        self.failed_at = None
+    
+    @property
+    def healthy(self):
+        return self.failed_at is None or time.monotonic() - self.failed_at >= self.retry_after
+    
+    def mark_failed(self):
+        self.failed_at = time.monotonic()
+    
+    def acquire(self):
+        with self.lock:
+            self.streams += 1
+    
+    def release(self):
+        with self.lock:
+            self.streams -= 1
+
+class AudioNodePool:
+    def __init__(self, addresses=()):
+        self.nodes = [AudioNode(address) for address in addresses]
+    
+    def add(self, address):
+        self.nodes.append(AudioNode(address))
+    
+    def pick(self):
+        nodes = [node for node in self.nodes if node.healthy]
+        return min(nodes, key=lambda node: node.streams) if nodes else None
+    
+    def stats(self):
+        return {f"{node.address[0]}:{node.address[1]}": node.streams for node in self.nodes}
+
+class RemoteAudioSource(discord.AudioSource):
+    def __init__(self, node, request):
+        self.node = node
+        self.request = request
+        self.sock = None
+        self.stream = None
+    
+    def connect(self, timeout=3):
+        try:
+            self.sock = socket.create_connection(self.node.address, timeout=timeout)
+            self.sock.sendall(json.dumps(self.request).encode() + b"\n")
+        except OSError:
+            self.node.mark_failed()
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+            raise
+        self.sock.settimeout(10)
+        self.stream = self.sock.makefile('rb')
+        self.node.acquire()
+        self.node.failed_at = None
+    
+    def read(self):
+        try:
+            header = self.stream.read(2)
+            length = int.from_bytes(header, 'big') if len(header) == 2 else 0
+            return self.stream.read(length) if length else b""
+        except OSError as e:
+            print(f"Audio node {self.node.address} failed: {e}")
+            self.node.mark_failed()
+            return b""
+    
+    def is_opus(self):
+        return True
+    
+    def cleanup(self):
+        if self.sock is not None:
+            self.stream.close()
+            self.sock.close()
+            self.sock = None
+            self.node.release()
+
+audio_nodes = AudioNodePool(address.strip() for address in os.environ.get("BLEED_AUDIO_NODES", "").split(",") if address.strip())
+audio_token = os.environ.get("BLEED_AUDIO_TOKEN")
+
+def parse_timestamp(value):
+    seconds = 0
+    for part in value.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
 class MusicPlayer:
-    def __init__(self, bot):
+    def __init__(self, bot, guild_id):
         self.bot = bot
-        self.queue = []
+        self.guild_id = guild_id
+        self.queue = deque()
         self.current = None
         self.voice_client = None
-        self.volume = 0.5
+        self.connecting = None
+        self.volume = 1.0
         self.repeat_mode = "off"
+        self.lookahead = 2
+        self.skip_requested = False
+        self.preset = "off"
+        self.stream_url = None
+        self.started_at = None
+        self.paused_at = None
+        self.offset = 0.0
+        self.idle_since = time.monotonic()
+        self.alone_since = None
+        self.history = deque(maxlen=50)
+        self.recommendation = None
+    
+    @property
+    def state(self):
+        if self.connecting is not None:
+            return "connecting"
+        if not self.voice_client or not self.voice_client.is_connected():
+            return "disconnected"
+        if self.voice_client.is_paused():
+            return "paused"
+        if self.voice_client.is_playing():
+            return "playing"
+        return "idle"
+    
+    async def connect(self, channel):
+        # Concurrent callers share one handshake, and the player reports "connecting" until it
+        # finishes so the reaper does not take it for a dead player in the meantime.
+        if self.connecting is None:
+            self.connecting = asyncio.create_task(channel.connect())
+            self.connecting.add_done_callback(self.connected)
+        await asyncio.shield(self.connecting)
+    
+    def connected(self, task):
+        self.connecting = None
+        if not task.cancelled() and task.exception() is None:
+            self.voice_client = task.result()
+            self.idle_since = time.monotonic()
+    
+    async def resolve(self, track):
+        url = await track_resolver.stream_url(track)
+        if 'codec' not in track:
+            track['codec'], track['bitrate'] = await discord.FFmpegOpusAudio.probe(url)
+        return url
+    
+    def prefetch(self):
+        for index in range(min(self.lookahead, len(self.queue))):
+            track = self.queue[index]
+            if 'prefetch' not in track:
+                task = asyncio.create_task(self.resolve(track))
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+                track['prefetch'] = task
+    
+    def next_track(self):
+        if self.repeat_mode == "current" and self.current and not self.skip_requested:
+            return self.current
+        
+        if self.repeat_mode == "queue" and self.current:
+            self.current.pop('prefetch', None)
+            self.queue.append(self.current)
+        
+        return self.queue.popleft() if self.queue else None
+    
+    def skip(self):
+        self.skip_requested = True
+        self.voice_client.stop()
+    
+    def clear(self):
+        for track in self.queue:
+            prefetch = track.pop('prefetch', None)
+            if prefetch:
+                prefetch.cancel()
+        self.queue.clear()
+    
+    def stop(self):
+        self.clear()
+        self.cancel_recommendation()
+        self.current = None
+        if self.voice_client and (self.voice_client.is_playing() or self.voice_client.is_paused()):
+            self.voice_client.stop()
+    
+    def build_source(self, url, position=0.0):
+        before_options = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
+        if position:
+            before_options += f" -ss {position:.2f}"
+        
+        options = compile_audio_options(self.preset, self.volume)
+        bitrate = min(int(self.current.get('bitrate') or 128), 512)
+        codec = "copy" if options == "-vn" and self.current.get('codec') == "opus" else "libopus"
+        node = audio_nodes.pick()
+        if node:
+            return RemoteAudioSource(node, {'url': url, 'position': position, 'preset': self.preset, 'volume': self.volume, 
+                                            'bitrate': bitrate, 'codec': codec, 'token': audio_token})
+        if codec == "copy":
+            return discord.FFmpegOpusAudio(url, bitrate=bitrate, codec=codec, before_options=before_options, options=options)
+        
+        # Anything that has to be re-encoded is cheaper as PCM encoded in-process than as ffmpeg's libopus
+        # (about 1.2% vs 4% of a core per stream, see benchmarks/stream_cpu.py), and its volume changes live.
+        options = compile_audio_options(self.preset, None)
+        source = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(url, before_options=before_options, options=options))
+        source.volume = self.volume
+        return source
+    
+    async def open_source(self, url, position=0.0):
+        # Remote sources connect before they reach the voice client; a node that refuses is
+        # marked unhealthy and the next one (or ffmpeg in this process) is tried instead.
+        while True:
+            source = self.build_source(url, position)
+            if not isinstance(source, RemoteAudioSource):
+                return source
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, source.connect)
+                return source
+            except OSError as e:
+                print(f"Audio node {source.node.address} unavailable: {e}")
+    
+    def position(self):
+        if self.started_at is None:
+            return 0.0
+        speed = audio_presets[self.preset][1]
+        return self.offset + ((self.paused_at or time.monotonic()) - self.started_at) * speed
+    
+    def pause(self):
+        self.voice_client.pause()
+        self.paused_at = time.monotonic()
+        self.idle_since = self.paused_at
+    
+    def resume(self):
+        self.voice_client.resume()
+        self.idle_since = None
+        if self.paused_at is not None:
+            self.started_at += time.monotonic() - self.paused_at
+            self.paused_at = None
+    
+    async def restart(self, position=None):
+        if not self.current or not self.stream_url or not self.voice_client or not self.voice_client.source:
+            return False
+        
+        if position is None:
+            position = self.position()
+        
+        current = self.current
+        source = await self.open_source(self.stream_url, position)
+        if self.current is not current or not self.voice_client or not self.voice_client.source:
+            source.cleanup()
+            return False
+        
+        old_source = self.voice_client.source
+        self.voice_client.source = source
+        old_source.cleanup()
+        
+        self.offset = position
+        self.started_at = time.monotonic()
+        if self.paused_at is not None:
+            self.voice_client.pause()
+            self.paused_at = self.started_at
+        return True
+    
+    async def set_preset(self, preset):
+        position = self.position()
+        self.preset = preset
+        await self.restart(position)
+    
+    async def seek(self, position):
+        return await self.restart(position)
+    
+    async def set_volume(self, volume):
+        self.volume = volume
+        source = self.voice_client.source if self.voice_client else None
+        if isinstance(source, discord.PCMVolumeTransformer):
+            source.volume = volume
+        else:
+            await self.restart()
+    
+    def after_play(self, error):
+        if error:
+            print(f"Player error: {error}")
+        future = asyncio.run_coroutine_threadsafe(self.play_next(), self.bot.loop)
+        future.add_done_callback(self.play_next_done)
+    
+    @staticmethod
+    def play_next_done(future):
+        if not future.cancelled() and future.exception():
+            print(f"Failed to advance player: {future.exception()}")
+    
+    async def recommend(self, track):
+        skip = set(self.history)
+        skip.update(queued['id'] for queued in self.queue)
+        for candidate in await track_resolver.related(track):
+            if candidate['id'] not in skip:
+                song = dict(candidate, requester=self.bot.user, autoplay=True)
+                await self.resolve(song)
+                return song
+        return None
+    
+    def cancel_recommendation(self):
+        if self.recommendation:
+            self.recommendation[1].cancel()
+            self.recommendation = None
+    
+    async def autoplay_track(self, previous):
+        if self.recommendation and self.recommendation[0] == previous['id']:
+            task = self.recommendation[1]
+        else:
+            self.cancel_recommendation()
+            task = asyncio.create_task(self.recommend(previous))
+        self.recommendation = None
         
+        try:
+            return await task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Autoplay failed after {previous['title']}: {e}")
+            return None
+    
     async def play_next(self):
-        if self.queue:
-            self.current = self.queue.pop(0)
-            source = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(self.current['url']))
-            source.volume = self.volume
-            self.voice_client.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(self.play_next(), self.bot.loop))
+        while True:
+            previous = self.current
+            track = self.next_track()
+            if track is None and previous and (await self.bot.get_music_settings(self.guild_id)).autoplay:
+                track = await self.autoplay_track(previous)
+            self.skip_requested = False
+            self.current = track
+            if track is None:
+                self.idle_since = time.monotonic()
+                return
+            
+            try:
+                prefetch = track.pop('prefetch', None)
+                if prefetch:
+                    await prefetch
+                url = await self.resolve(track)
+                break
+            except Exception as e:
+                print(f"Failed to resolve {track['title']}: {e}")
+                self.current = None
+        
+        source = await self.open_source(url)
+        if not self.voice_client or not self.voice_client.is_connected():
+            source.cleanup()
+            self.current = None
+            self.idle_since = time.monotonic()
+            return
+        
+        self.stream_url = url
+        self.offset = 0.0
+        self.paused_at = None
+        self.voice_client.play(source, after=self.after_play)
+        self.started_at = time.monotonic()
+        self.idle_since = None
+        self.history.append(track['id'])
+        self.prefetch()
+        
+        if not self.queue and (await self.bot.get_music_settings(self.guild_id)).autoplay:
+            if not self.recommendation or self.recommendation[0] != track['id']:
+                self.cancel_recommendation()
+                task = asyncio.create_task(self.recommend(track))
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+                self.recommendation = (track['id'], task)
+    
+    async def disconnect(self):
+        if self.connecting is not None:
+            self.connecting.cancel()
+        self.stop()
+        if self.voice_client and self.voice_client.is_connected():
+            await self.voice_client.disconnect(force=True)
+        self.voice_client = None
 
-music_players = {}
+class PlayerManager:
+    def __init__(self, bot, idle_timeout=300, alone_timeout=120, check_interval=30):
+        self.bot = bot
+        self.players = {}
+        self.idle_timeout = idle_timeout
+        self.alone_timeout = alone_timeout
+        self.check_interval = check_interval
+        self.reaper_task = None
+    
+    def __contains__(self, guild_id):
+        return guild_id in self.players
+    
+    def __getitem__(self, guild_id):
+        return self.players[guild_id]
+    
+    def __len__(self):
+        return len(self.players)
+    
+    def get(self, guild_id):
+        player = self.players.get(guild_id)
+        if player is None:
+            player = self.players[guild_id] = MusicPlayer(self.bot, guild_id)
+        if self.reaper_task is None:
+            self.reaper_task = asyncio.create_task(self.reaper_loop())
+        return player
+    
+    async def destroy(self, guild_id):
+        player = self.players.pop(guild_id, None)
+        if player:
+            await player.disconnect()
+    
+    def stats(self):
+        counts = {"players": len(self.players), "playing": 0, "paused": 0, "idle": 0, "connecting": 0, "disconnected": 0}
+        for player in self.players.values():
+            counts[player.state] += 1
+        return counts
+    
+    def expired(self, player, now):
+        state = player.state
+        if state == "connecting":
+            return False
+        if state == "disconnected":
+            return True
+        if player.alone_since is not None and now - player.alone_since >= self.alone_timeout:
+            return True
+        return player.idle_since is not None and now - player.idle_since >= self.idle_timeout
+    
+    async def reaper_loop(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            now = time.monotonic()
+            for guild_id, player in list(self.players.items()):
+                if self.expired(player, now):
+                    try:
+                        await self.destroy(guild_id)
+                    except Exception as e:
+                        print(f"Failed to clean up player for {guild_id}: {e}")
+    
+    def update_listeners(self, guild):
+        player = self.players.get(guild.id)
+        if not player or not player.voice_client or not player.voice_client.channel:
+            return
+        
+        listeners = [member for member in player.voice_client.channel.members if not member.bot]
+        if listeners:
+            player.alone_since = None
+        elif player.alone_since is None:
+            player.alone_since = time.monotonic()
+    
+    async def on_voice_state_update(self, member, before, after):
+        if member.id == self.bot.user.id:
+            if before.channel and not after.channel:
+                await self.destroy(member.guild.id)
+            elif after.channel:
+                self.update_listeners(member.guild)
+        elif before.channel != after.channel:
+            self.update_listeners(member.guild)
+    
+    async def close(self):
+        if self.reaper_task:
+            self.reaper_task.cancel()
+        for guild_id in list(self.players):
+            await self.destroy(guild_id)
+
+music_players = PlayerManager(bot)
+track_resolver = TrackResolver()
 
 @bot.event
 async def on_ready():
@@ -174,36 +2382,22 @@ async def on_message(message):
         return
     
     if message.guild:
-        conn = sqlite3.connect(bot.db_path)
-        cursor = conn.cursor()
+        prefix = await bot.get_prefix(message)
+        if message.content.startswith(prefix):
+            aliases = await bot.get_aliases(message.guild.id)
+            message.content = prefix + aliases.expand(message.content[len(prefix):], bot.alias_depth)
         
-        cursor.execute("SELECT shortcut, command FROM aliases WHERE guild_id = ?", (message.guild.id,))
-        aliases = cursor.fetchall()
-        
-        for shortcut, command in aliases:
-            if message.content.startswith(shortcut):
-                message.content = message.content.replace(shortcut, command, 1)
-                break
-        
-        cursor.execute("SELECT trigger, response FROM autoresponders WHERE guild_id = ?", (message.guild.id,))
-        autoresponders = cursor.fetchall()
-        
-        for trigger, response in autoresponders:
-            if trigger.lower() in message.content.lower():
-                await message.channel.send(response)
-                break
+        autoresponder = await bot.get_autoresponder(message.guild.id)
+        response = autoresponder.match(message.content)
+        if response:
+            bot.outbound.send(message.channel, content=response)
         
         user_id = message.author.id
         guild_id = message.guild.id
         
-        if user_id not in bot.cooldowns:
-            bot.cooldowns[user_id] = 0
-        
-        if asyncio.get_event_loop().time() - bot.cooldowns[user_id] >= 60:
-            bot.cooldowns[user_id] = asyncio.get_event_loop().time()
-            
+        if bot.cooldowns.try_acquire((guild_id, user_id)):
             xp_gain = random.randint(15, 25)
-            level_up, new_level = bot.add_xp(guild_id, user_id, xp_gain)
+            level_up, new_level = await bot.add_xp(guild_id, user_id, xp_gain)
             
             if level_up:
                 embed = discord.Embed(
@@ -211,137 +2405,110 @@ async def on_message(message):
                     description=f"{message.author.mention} reached level **{new_level}**!",
                     color=0x00ff00
                 )
-                await message.channel.send(embed=embed, delete_after=10)
-        
-        conn.close()
+                bot.outbound.send(message.channel, OutboundDispatcher.LOW, "level_up", embed=embed, delete_after=10)
     
     await bot.process_commands(message)
 
+@bot.outbound.merger("level_up")
+def merge_level_ups(pending, new):
+    pending['embed'].description += "\n" + new['embed'].description
+    return pending
+
 @bot.event
 async def on_message_delete(message):
     if message.author.bot or not message.guild:
         return
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO sniped_messages (guild_id, channel_id, author_id, content, timestamp, message_type) VALUES (?, ?, ?, ?, ?, ?)", 
-                   (message.guild.id, message.channel.id, message.author.id, message.content, str(datetime.now()), "deleted"))
-    conn.commit()
-    conn.close()
+    bot.add_snipe(message.guild.id, message.channel.id, message.author.id, message.content, "deleted")
 
 @bot.event
 async def on_message_edit(before, after):
-    if before.author.bot or not before.guild:
+    if before.author.bot or not before.guild or before.content == after.content:
         return
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO sniped_messages (guild_id, channel_id, author_id, content, timestamp, message_type) VALUES (?, ?, ?, ?, ?, ?)", 
-                   (before.guild.id, before.channel.id, before.author.id, f"{before.content} -> {after.content}", str(datetime.now()), "edited"))
-    conn.commit()
-    conn.close()
+    bot.add_snipe(before.guild.id, before.channel.id, before.author.id, f"{before.content} -> {after.content}", "edited")
+
+@bot.timers.handler("self_destruct")
+async def delete_timed_message(guild_id, channel_id, message_id):
+    channel = bot.get_channel(channel_id)
+    if channel:
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except discord.NotFound:
+            pass
 
 @bot.event
 async def on_member_join(member):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT channel_id, message, self_destruct FROM welcome_messages WHERE guild_id = ?", 
-                   (member.guild.id,))
-    results = cursor.fetchall()
-    conn.close()
-    
-    for channel_id, message, self_destruct in results:
-        channel = member.guild.get_channel(channel_id)
-        if channel:
-            formatted_message = message.replace("{user}", member.mention).replace("{server}", member.guild.name)
-            msg = await channel.send(formatted_message)
-            
-            if self_destruct:
-                await asyncio.sleep(self_destruct)
-                try:
-                    await msg.delete()
-                except:
-                    pass
+    await bot.welcomes.dispatch(member.guild, member, member.mention)
 
+# The raw event fires whether or not the member was cached, which the lean cache policy relies on
 @bot.event
-async def on_member_remove(member):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT channel_id, message, self_destruct FROM goodbye_messages WHERE guild_id = ?", 
-                   (member.guild.id,))
-    results = cursor.fetchall()
-    conn.close()
-    
-    for channel_id, message, self_destruct in results:
-        channel = member.guild.get_channel(channel_id)
-        if channel:
-            formatted_message = message.replace("{user}", str(member)).replace("{server}", member.guild.name)
-            msg = await channel.send(formatted_message)
-            
-            if self_destruct:
-                await asyncio.sleep(self_destruct)
-                try:
-                    await msg.delete()
-                except:
-                    pass
+async def on_raw_member_remove(payload):
+    guild = bot.get_guild(payload.guild_id)
+    if guild:
+        await bot.goodbyes.dispatch(guild, payload.user, str(payload.user))
 
 @bot.event
-async def on_guild_channel_delete(channel):
-    async for entry in channel.guild.audit_logs(action=discord.AuditLogAction.channel_delete, limit=1):
-        if bot.track_action(entry.user.id, 'channel_delete'):
-            try:
-                await channel.guild.ban(entry.user, reason="Anti-nuke: Excessive channel deletions")
-                
-                embed = discord.Embed(
-                    title="🛡️ Anti-Nuke Triggered",
-                    description=f"**{entry.user}** was banned for deleting too many channels",
-                    color=0xff0000,
-                    timestamp=datetime.now()
-                )
-                
-                for text_channel in channel.guild.text_channels:
-                    if text_channel.permissions_for(channel.guild.me).send_messages:
-                        await text_channel.send(embed=embed)
-                        break
-                        
-            except discord.Forbidden:
-                pass
+async def on_audit_log_entry_create(entry):
+    action_type = bot.antinuke_actions.get(entry.action)
+    if action_type is None or entry.user_id is None:
+        return
+    
+    guild = entry.guild
+    if entry.user_id in (bot.user.id, guild.owner_id):
+        return
+    
+    # Other bots (moderation bots clearing a raid) are exempt as before; when the actor isn't
+    # cached we can't tell, so only the whitelist applies
+    if entry.user is not None and entry.user.bot:
+        return
+    
+    config = await bot.get_antinuke_config(guild.id)
+    if entry.user_id in config.whitelist:
+        return
+    
+    if not bot.track_action(guild.id, entry.user_id, action_type, config.limits):
+        return
+    
+    if not bot.antinuke_punished.try_acquire((guild.id, entry.user_id)):
+        return
+    
+    offender = entry.user or discord.Object(id=entry.user_id)
+    try:
+        await guild.ban(offender, reason=f"Anti-nuke: Excessive {action_type.replace('_', ' ')}")
+    except discord.HTTPException:
+        return
+    
+    embed = discord.Embed(
+        title="🛡️ Anti-Nuke Triggered",
+        description=f"**{entry.user or entry.user_id}** was banned for excessive {action_type.replace('_', ' ')} ({config.limits[action_type]} in {bot.action_timeframe}s)",
+        color=0xff0000,
+        timestamp=datetime.now()
+    )
+    await send_antinuke_alert(guild, embed)
 
-@bot.event
-async def on_member_ban(guild, user):
-    async for entry in guild.audit_logs(action=discord.AuditLogAction.ban, limit=1):
-        if entry.user.bot:
-            continue
-            
-        if bot.track_action(entry.user.id, 'ban'):
-            try:
-                await guild.ban(entry.user, reason="Anti-nuke: Excessive bans")
-                
-                embed = discord.Embed(
-                    title="🛡️ Anti-Nuke Triggered",
-                    description=f"**{entry.user}** was banned for excessive ban usage",
-                    color=0xff0000,
-                    timestamp=datetime.now()
-                )
-                
-                for channel in guild.text_channels:
-                    if channel.permissions_for(guild.me).send_messages:
-                        await channel.send(embed=embed)
-                        break
-                        
-            except discord.Forbidden:
-                pass
+async def send_antinuke_alert(guild, embed):
+    for channel in guild.text_channels:
+        if channel.permissions_for(guild.me).send_messages:
+            await bot.outbound.send(channel, OutboundDispatcher.ALERT, embed=embed)
+            break
+
+@bot.welcomes.on_raid
+async def flag_join_raid(guild, count):
+    embed = discord.Embed(
+        title="🛡️ Join Raid Detected",
+        description=f"**{count}** members joined within {bot.welcomes.rates.window}s, welcome messages are being sent as digests",
+        color=0xff0000,
+        timestamp=datetime.now()
+    )
+    await send_antinuke_alert(guild, embed)
 
 @bot.event
 async def on_raw_reaction_add(payload):
-    if payload.user_id == bot.user.id:
+    if str(payload.emoji) != "⭐" or not payload.guild_id or payload.user_id == bot.user.id:
         return
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT channel_id, threshold FROM starboard WHERE guild_id = ?", (payload.guild_id,))
-    result = cursor.fetchone()
-    conn.close()
+    result = await bot.get_starboard_config(payload.guild_id)
     
     if not result:
         return
@@ -352,25 +2519,40 @@ async def on_raw_reaction_add(payload):
     if not starboard_channel or payload.channel_id == starboard_channel_id:
         return
     
-    channel = bot.get_channel(payload.channel_id)
-    message = await channel.fetch_message(payload.message_id)
+    async with bot.star_lock(payload.message_id):
+        entry = bot.stars.get(payload.message_id)
+        if entry is None:
+            entry = await bot.load_star_entry(payload)
+            if entry is None:
+                return
+        else:
+            entry.count += 1
+            bot.stars.move_to_end(payload.message_id)
+        
+        if entry.post_id or entry.count >= threshold:
+            await bot.update_star_post(payload.guild_id, payload.message_id, entry, starboard_channel, threshold)
+
+@bot.event
+async def on_raw_reaction_remove(payload):
+    if str(payload.emoji) != "⭐" or not payload.guild_id:
+        return
     
-    star_reaction = None
-    for reaction in message.reactions:
-        if str(reaction.emoji) == "⭐":
-            star_reaction = reaction
-            break
+    result = await bot.get_starboard_config(payload.guild_id)
     
-    if star_reaction and star_reaction.count >= threshold:
-        embed = discord.Embed(description=message.content, color=0xffd700, timestamp=message.created_at)
-        embed.set_author(name=message.author.display_name, icon_url=message.author.display_avatar.url)
-        embed.add_field(name="Source", value=f"[Jump to message]({message.jump_url})", inline=False)
-        embed.set_footer(text=f"⭐ {star_reaction.count} | #{channel.name}")
+    async with bot.star_lock(payload.message_id):
+        entry = bot.stars.get(payload.message_id)
+        if entry is None:
+            return
         
-        if message.attachments:
-            embed.set_image(url=message.attachments[0].url)
+        entry.count = max(entry.count - 1, 0)
+        
+        if not result or not entry.post_id:
+            return
         
-        await starboard_channel.send(embed=embed)
+        starboard_channel_id, threshold = result
+        starboard_channel = bot.get_channel(starboard_channel_id)
+        if starboard_channel:
+            await bot.update_star_post(payload.guild_id, payload.message_id, entry, starboard_channel, threshold)
 
 @bot.group(name='prefix', invoke_without_command=True)
 async def prefix_group(ctx):
@@ -381,26 +2563,14 @@ async def prefix_group(ctx):
 @prefix_group.command(name='set')
 @commands.has_permissions(administrator=True)
 async def set_prefix(ctx, new_prefix):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("INSERT OR REPLACE INTO prefixes (guild_id, prefix) VALUES (?, ?)", 
-                   (ctx.guild.id, new_prefix))
-    conn.commit()
-    conn.close()
+    await bot.set_guild_prefix(ctx.guild.id, new_prefix)
     
     embed = discord.Embed(title="Prefix Updated", description=f"Server prefix changed to: `{new_prefix}`", color=0x00ff00)
     await ctx.send(embed=embed)
 
 @prefix_group.command(name='self')
 async def self_prefix(ctx, new_prefix):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("INSERT OR REPLACE INTO prefixes (user_id, user_prefix) VALUES (?, ?)", 
-                   (ctx.author.id, new_prefix))
-    conn.commit()
-    conn.close()
+    await bot.set_user_prefix(ctx.author.id, new_prefix)
     
     embed = discord.Embed(title="Personal Prefix Set", description=f"Your personal prefix is now: `{new_prefix}`", color=0x00ff00)
     await ctx.send(embed=embed)
@@ -421,12 +2591,8 @@ async def setup(ctx):
         
         staff_role = await guild.create_role(name="Staff", color=0xff0000, permissions=discord.Permissions(kick_members=True, ban_members=True, manage_messages=True))
         
-        conn = sqlite3.connect(bot.db_path)
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO moderation (guild_id, staff_role_id) VALUES (?, ?)", 
-                       (guild.id, staff_role.id))
-        conn.commit()
-        conn.close()
+        await bot.db.execute("INSERT INTO moderation (guild_id, staff_role_id) VALUES (?, ?) ON CONFLICT (guild_id) DO UPDATE SET staff_role_id = excluded.staff_role_id", 
+                             (guild.id, staff_role.id))
         
         embed = discord.Embed(title="Setup Complete", 
                              description=f"Created:\n• {mod_logs.mention}\n• {reports.mention}\n• {staff_role.mention}", 
@@ -441,31 +2607,41 @@ async def setup(ctx):
 async def setupmute(ctx):
     guild = ctx.guild
     
-    mute_role = await guild.create_role(name="Muted", color=0x808080)
-    
-    for channel in guild.channels:
-        await channel.set_permissions(mute_role, send_messages=False, speak=False, add_reactions=False)
-    
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE moderation SET mute_role_id = ? WHERE guild_id = ?", 
-                   (mute_role.id, guild.id))
-    conn.commit()
-    conn.close()
-    
-    embed = discord.Embed(title="Mute Role Created", description=f"Created {mute_role.mention} with proper permissions", color=0x00ff00)
-    await ctx.send(embed=embed)
+    result = await bot.db.fetchone("SELECT mute_role_id FROM moderation WHERE guild_id = ?", (guild.id,))
+    mute_role = guild.get_role(result[0]) if result and result[0] else None
+    if mute_role is None:
+        mute_role = await guild.create_role(name="Muted", color=0x808080)
+        await bot.db.execute("INSERT INTO moderation (guild_id, mute_role_id) VALUES (?, ?) ON CONFLICT (guild_id) DO UPDATE SET mute_role_id = excluded.mute_role_id", 
+                             (guild.id, mute_role.id))
+    
+    overwrite = discord.PermissionOverwrite(send_messages=False, speak=False, add_reactions=False)
+    job = BulkOverwriteJob(guild, mute_role, overwrite)
+    
+    def progress():
+        return f"Configuring {mute_role.mention}: {job.done + job.skipped}/{job.total} channels" + (f", {len(job.failed)} failed" if job.failed else "")
+    
+    status = await ctx.send(embed=discord.Embed(title="Setting Up Mute Role", description=progress(), color=0x2f3136))
+    runner = asyncio.create_task(job.run())
+    while not runner.done():
+        await asyncio.wait({runner}, timeout=3)
+        if not runner.done():
+            await status.edit(embed=discord.Embed(title="Setting Up Mute Role", description=progress(), color=0x2f3136))
+    await runner
+    
+    if job.failed:
+        embed = discord.Embed(title="Mute Role Partially Configured", 
+                             description=f"{progress()}\nRun `setupmute` again to retry the remaining channels", 
+                             color=0xff0000)
+    else:
+        embed = discord.Embed(title="Mute Role Configured", description=f"{mute_role.mention} is set up in {job.total} channels", color=0x00ff00)
+    await status.edit(embed=embed)
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 async def bind(ctx, action, role: discord.Role):
     if action == "staff":
-        conn = sqlite3.connect(bot.db_path)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE moderation SET staff_role_id = ? WHERE guild_id = ?", 
-                       (role.id, ctx.guild.id))
-        conn.commit()
-        conn.close()
+        await bot.db.execute("INSERT INTO moderation (guild_id, staff_role_id) VALUES (?, ?) ON CONFLICT (guild_id) DO UPDATE SET staff_role_id = excluded.staff_role_id", 
+                             (ctx.guild.id, role.id))
         
         embed = discord.Embed(title="Staff Role Bound", description=f"{role.mention} is now the staff role", color=0x00ff00)
         await ctx.send(embed=embed)
@@ -488,12 +2664,9 @@ async def welcome_add(ctx, channel: discord.TextChannel, *, message_and_flags):
         except:
             self_destruct = None
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO welcome_messages (guild_id, channel_id, message, self_destruct) VALUES (?, ?, ?, ?)", 
-                   (ctx.guild.id, channel.id, message, self_destruct))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("INSERT OR REPLACE INTO welcome_messages (guild_id, channel_id, message, self_destruct) VALUES (?, ?, ?, ?)", 
+                         (ctx.guild.id, channel.id, message, self_destruct))
+    bot.welcomes.configs.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Welcome Message Added", 
                          description=f"Channel: {channel.mention}\nMessage: {message}", 
@@ -503,24 +2676,17 @@ async def welcome_add(ctx, channel: discord.TextChannel, *, message_and_flags):
 @welcome_group.command(name='remove')
 @commands.has_permissions(manage_guild=True)
 async def welcome_remove(ctx, channel: discord.TextChannel):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM welcome_messages WHERE guild_id = ? AND channel_id = ?", 
-                   (ctx.guild.id, channel.id))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("DELETE FROM welcome_messages WHERE guild_id = ? AND channel_id = ?", 
+                         (ctx.guild.id, channel.id))
+    bot.welcomes.configs.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Welcome Message Removed", description=f"Removed welcome message for {channel.mention}", color=0x00ff00)
     await ctx.send(embed=embed)
 
 @welcome_group.command(name='view')
 async def welcome_view(ctx, channel: discord.TextChannel):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT message, self_destruct FROM welcome_messages WHERE guild_id = ? AND channel_id = ?", 
-                   (ctx.guild.id, channel.id))
-    result = cursor.fetchone()
-    conn.close()
+    result = await bot.db.fetchone("SELECT message, self_destruct FROM welcome_messages WHERE guild_id = ? AND channel_id = ?", 
+                                   (ctx.guild.id, channel.id))
     
     if result:
         message, self_destruct = result
@@ -533,11 +2699,7 @@ async def welcome_view(ctx, channel: discord.TextChannel):
 
 @welcome_group.command(name='list')
 async def welcome_list(ctx):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT channel_id FROM welcome_messages WHERE guild_id = ?", (ctx.guild.id,))
-    results = cursor.fetchall()
-    conn.close()
+    results = await bot.db.fetchall("SELECT channel_id FROM welcome_messages WHERE guild_id = ?", (ctx.guild.id,))
     
     if results:
         channels = [f"<#{channel_id[0]}>" for channel_id in results]
@@ -564,63 +2726,66 @@ async def goodbye_add(ctx, channel: discord.TextChannel, *, message_and_flags):
         except:
             self_destruct = None
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO goodbye_messages (guild_id, channel_id, message, self_destruct) VALUES (?, ?, ?, ?)", 
-                   (ctx.guild.id, channel.id, message, self_destruct))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("INSERT OR REPLACE INTO goodbye_messages (guild_id, channel_id, message, self_destruct) VALUES (?, ?, ?, ?)", 
+                         (ctx.guild.id, channel.id, message, self_destruct))
+    bot.goodbyes.configs.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Goodbye Message Added", 
                          description=f"Channel: {channel.mention}\nMessage: {message}", 
                          color=0x00ff00)
     await ctx.send(embed=embed)
 
+def dj_only():
+    async def predicate(ctx):
+        if ctx.guild is None:
+            return False
+        settings = await bot.get_music_settings(ctx.guild.id)
+        if settings.dj_role_id is None or ctx.author.guild_permissions.manage_guild:
+            return True
+        return any(role.id == settings.dj_role_id for role in ctx.author.roles)
+    return commands.check(predicate)
+
 @bot.command()
 async def play(ctx, *, query):
     if not ctx.author.voice:
         return await ctx.send("You need to be in a voice channel!")
     
-    if ctx.guild.id not in music_players:
-        music_players[ctx.guild.id] = MusicPlayer(bot)
-    
-    player = music_players[ctx.guild.id]
-    
-    if not player.voice_client:
-        player.voice_client = await ctx.author.voice.channel.connect()
+    player = music_players.get(ctx.guild.id)
     
-    ytdl_opts = {
-        'format': 'bestaudio/best',
-        'quiet': True,
-        'no_warnings': True,
-    }
+    if not player.voice_client or not player.voice_client.is_connected():
+        await player.connect(ctx.author.voice.channel)
+    elif player.voice_client.channel != ctx.author.voice.channel and not player.current:
+        await player.voice_client.move_to(ctx.author.voice.channel)
+    music_players.update_listeners(ctx.guild)
     
-    with youtube_dl.YoutubeDL(ytdl_opts) as ytdl:
-        try:
-            info = ytdl.extract_info(f"ytsearch:{query}", download=False)
-            if 'entries' in info:
-                info = info['entries'][0]
-            
-            song = {
-                'title': info['title'],
-                'url': info['url'],
-                'duration': info.get('duration', 0),
-                'requester': ctx.author
-            }
-            
-            player.queue.append(song)
-            
-            embed = discord.Embed(title="Added to Queue", description=f"**{song['title']}**\nRequested by {ctx.author.mention}", color=0x00ff00)
-            await ctx.send(embed=embed)
+    try:
+        track = await track_resolver.search(query)
+        
+        song = {
+            'id': track['id'],
+            'title': track['title'],
+            'webpage_url': track['webpage_url'],
+            'duration': track['duration'],
+            'requester': ctx.author
+        }
+        
+        player.queue.append(song)
+        
+        embed = discord.Embed(title="Added to Queue", description=f"**{song['title']}**\nRequested by {ctx.author.mention}", color=0x00ff00)
+        await ctx.send(embed=embed)
+        
+        if player.current is None:
+            await player.play_next()
+        else:
+            player.prefetch()
             
-            if not player.voice_client.is_playing():
-                await player.play_next()
-                
-        except Exception as e:
-            await ctx.send(f"Error: {str(e)}")
+    except asyncio.TimeoutError:
+        await ctx.send("Error: Search timed out, try again!")
+    except Exception as e:
+        await ctx.send(f"Error: {str(e)}")
 
-@bot.command()
-async def queue(ctx):
+@bot.group(name='queue', invoke_without_command=True)
+async def queue_group(ctx, page: int = 1):
     if ctx.guild.id not in music_players:
         return await ctx.send("No music player active!")
     
@@ -629,28 +2794,105 @@ async def queue(ctx):
     if not player.queue:
         return await ctx.send("Queue is empty!")
     
+    pages = (len(player.queue) + 9) // 10
+    page = max(1, min(page, pages))
+    start = (page - 1) * 10
+    
     queue_list = []
-    for i, song in enumerate(player.queue[:10], 1):
-        queue_list.append(f"{i}. **{song['title']}** - {song['requester'].mention}")
+    for i in range(start, min(start + 10, len(player.queue))):
+        song = player.queue[i]
+        queue_list.append(f"{i + 1}. **{song['title']}** - {song['requester'].mention}")
     
     embed = discord.Embed(title="Music Queue", description="\n".join(queue_list), color=0x2f3136)
     if player.current:
         embed.add_field(name="Now Playing", value=f"**{player.current['title']}**", inline=False)
+    embed.set_footer(text=f"Page {page}/{pages} • {len(player.queue)} tracks • Repeat: {player.repeat_mode}")
     
     await ctx.send(embed=embed)
 
+@queue_group.command(name='remove')
+@dj_only()
+async def queue_remove(ctx, position: int):
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    player = music_players[ctx.guild.id]
+    
+    if not 1 <= position <= len(player.queue):
+        return await ctx.send(f"Position must be between 1-{len(player.queue)}!")
+    
+    song = player.queue[position - 1]
+    del player.queue[position - 1]
+    prefetch = song.pop('prefetch', None)
+    if prefetch:
+        prefetch.cancel()
+    player.prefetch()
+    
+    await ctx.send(f"🗑️ Removed **{song['title']}** from the queue")
+
+@queue_group.command(name='move')
+@dj_only()
+async def queue_move(ctx, position: int, new_position: int):
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    player = music_players[ctx.guild.id]
+    
+    if not 1 <= position <= len(player.queue) or not 1 <= new_position <= len(player.queue):
+        return await ctx.send(f"Positions must be between 1-{len(player.queue)}!")
+    
+    song = player.queue[position - 1]
+    del player.queue[position - 1]
+    player.queue.insert(new_position - 1, song)
+    player.prefetch()
+    
+    await ctx.send(f"↕️ Moved **{song['title']}** to position {new_position}")
+
+@bot.command()
+@dj_only()
+async def repeat(ctx, mode):
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    mode = mode.lower()
+    if mode not in ("off", "queue", "current"):
+        return await ctx.send("Repeat mode must be `off`, `queue`, or `current`!")
+    
+    music_players[ctx.guild.id].repeat_mode = mode
+    await ctx.send(f"🔁 Repeat set to **{mode}**")
+
+@bot.command()
+@dj_only()
+async def stop(ctx):
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    music_players[ctx.guild.id].stop()
+    await ctx.send("⏹️ Stopped and cleared the queue!")
+
+@bot.command()
+@dj_only()
+async def leave(ctx):
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    await music_players.destroy(ctx.guild.id)
+    await ctx.send("👋 Left the voice channel!")
+
 @bot.command()
+@dj_only()
 async def skip(ctx):
     if ctx.guild.id not in music_players:
         return await ctx.send("No music player active!")
     
     player = music_players[ctx.guild.id]
     
-    if player.voice_client and player.voice_client.is_playing():
-        player.voice_client.stop()
+    if player.voice_client and (player.voice_client.is_playing() or player.voice_client.is_paused()):
+        player.skip()
         await ctx.send("⏭️ Skipped!")
 
 @bot.command()
+@dj_only()
 async def pause(ctx):
     if ctx.guild.id not in music_players:
         return await ctx.send("No music player active!")
@@ -658,10 +2900,11 @@ async def pause(ctx):
     player = music_players[ctx.guild.id]
     
     if player.voice_client and player.voice_client.is_playing():
-        player.voice_client.pause()
+        player.pause()
         await ctx.send("⏸️ Paused!")
 
 @bot.command()
+@dj_only()
 async def resume(ctx):
     if ctx.guild.id not in music_players:
         return await ctx.send("No music player active!")
@@ -669,10 +2912,49 @@ async def resume(ctx):
     player = music_players[ctx.guild.id]
     
     if player.voice_client and player.voice_client.is_paused():
-        player.voice_client.resume()
+        player.resume()
         await ctx.send("▶️ Resumed!")
 
 @bot.command()
+@dj_only()
+async def seek(ctx, timestamp):
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    player = music_players[ctx.guild.id]
+    
+    try:
+        position = parse_timestamp(timestamp)
+    except ValueError:
+        return await ctx.send("Timestamp must look like `mm:ss`!")
+    
+    duration = player.current.get('duration') if player.current else 0
+    if position < 0 or (duration and position >= duration):
+        return await ctx.send("That position is outside the current track!")
+    
+    if not await player.seek(position):
+        return await ctx.send("Nothing is playing!")
+    
+    await ctx.send(f"⏩ Seeked to {position // 60}:{position % 60:02d}")
+
+@bot.command()
+@dj_only()
+async def preset(ctx, name=None):
+    if name is None:
+        return await ctx.send(f"Available presets: {', '.join(f'`{preset}`' for preset in audio_presets)}")
+    
+    if ctx.guild.id not in music_players:
+        return await ctx.send("No music player active!")
+    
+    name = name.lower()
+    if name not in audio_presets:
+        return await ctx.send(f"Unknown preset! Available presets: {', '.join(f'`{preset}`' for preset in audio_presets)}")
+    
+    await music_players[ctx.guild.id].set_preset(name)
+    await ctx.send(f"🎛️ Preset set to **{name}**")
+
+@bot.command()
+@dj_only()
 async def volume(ctx, vol: int):
     if not 0 <= vol <= 100:
         return await ctx.send("Volume must be between 0-100!")
@@ -681,13 +2963,46 @@ async def volume(ctx, vol: int):
         return await ctx.send("No music player active!")
     
     player = music_players[ctx.guild.id]
-    player.volume = vol / 100
-    
-    if player.voice_client and player.voice_client.source:
-        player.voice_client.source.volume = player.volume
+    await player.set_volume(vol / 100)
     
     await ctx.send(f"🔊 Volume set to {vol}%")
 
+@bot.group(name='settings', invoke_without_command=True)
+async def settings_group(ctx):
+    settings = await bot.get_music_settings(ctx.guild.id)
+    
+    embed = discord.Embed(title="Music Settings", color=0x2f3136)
+    embed.add_field(name="DJ Role", value=f"<@&{settings.dj_role_id}>" if settings.dj_role_id else "None", inline=False)
+    embed.add_field(name="Autoplay", value="On" if settings.autoplay else "Off", inline=False)
+    embed.set_footer(text="Use settings dj or settings autoplay")
+    await ctx.send(embed=embed)
+
+@settings_group.command(name='dj')
+@commands.has_permissions(manage_guild=True)
+async def settings_dj(ctx, role: discord.Role = None):
+    settings = await bot.get_music_settings(ctx.guild.id)
+    await bot.save_music_settings(ctx.guild.id, MusicSettings(role.id if role else None, settings.autoplay))
+    
+    description = f"DJ role set to {role.mention}" if role else "DJ role removed"
+    embed = discord.Embed(title="Music Settings Updated", description=description, color=0x00ff00)
+    await ctx.send(embed=embed)
+
+@settings_group.command(name='autoplay')
+@commands.has_permissions(manage_guild=True)
+async def settings_autoplay(ctx, mode):
+    mode = mode.lower()
+    if mode not in ("on", "off"):
+        return await ctx.send("Autoplay must be `on` or `off`!")
+    
+    settings = await bot.get_music_settings(ctx.guild.id)
+    await bot.save_music_settings(ctx.guild.id, MusicSettings(settings.dj_role_id, mode == "on"))
+    
+    if mode == "off" and ctx.guild.id in music_players:
+        music_players[ctx.guild.id].cancel_recommendation()
+    
+    embed = discord.Embed(title="Music Settings Updated", description=f"Autoplay turned **{mode}**", color=0x00ff00)
+    await ctx.send(embed=embed)
+
 @bot.group(name='alias', invoke_without_command=True)
 async def alias_group(ctx):
     await ctx.send("Use `alias add`, `alias remove`, `alias view`, or `alias list`")
@@ -695,12 +3010,9 @@ async def alias_group(ctx):
 @alias_group.command(name='add')
 @commands.has_permissions(manage_guild=True)
 async def alias_add(ctx, shortcut, *, command):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO aliases (guild_id, shortcut, command) VALUES (?, ?, ?)", 
-                   (ctx.guild.id, shortcut, command))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("INSERT OR REPLACE INTO aliases (guild_id, shortcut, command) VALUES (?, ?, ?)", 
+                         (ctx.guild.id, shortcut, command))
+    bot.aliases.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Alias Added", description=f"Shortcut: `{shortcut}`\nCommand: `{command}`", color=0x00ff00)
     await ctx.send(embed=embed)
@@ -708,23 +3020,32 @@ async def alias_add(ctx, shortcut, *, command):
 @alias_group.command(name='remove')
 @commands.has_permissions(manage_guild=True)
 async def alias_remove(ctx, shortcut):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM aliases WHERE guild_id = ? AND shortcut = ?", 
-                   (ctx.guild.id, shortcut))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("DELETE FROM aliases WHERE guild_id = ? AND shortcut = ?", 
+                         (ctx.guild.id, shortcut))
+    bot.aliases.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Alias Removed", description=f"Removed alias: `{shortcut}`", color=0x00ff00)
     await ctx.send(embed=embed)
 
+@alias_group.command(name='view')
+async def alias_view(ctx, shortcut):
+    aliases = await bot.get_aliases(ctx.guild.id)
+    command = aliases.commands.get(shortcut)
+    
+    if command is None:
+        return await ctx.send("No alias found with that shortcut.")
+    
+    expanded = aliases.expand(shortcut, bot.alias_depth)
+    description = f"Command: `{command}`"
+    if expanded != command:
+        description += f"\nExpands to: `{expanded}`"
+    
+    embed = discord.Embed(title=f"Alias: {shortcut}", description=description, color=0x2f3136)
+    await ctx.send(embed=embed)
+
 @alias_group.command(name='list')
 async def alias_list(ctx):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT shortcut, command FROM aliases WHERE guild_id = ?", (ctx.guild.id,))
-    results = cursor.fetchall()
-    conn.close()
+    results = await bot.db.fetchall("SELECT shortcut, command FROM aliases WHERE guild_id = ?", (ctx.guild.id,))
     
     if results:
         alias_list = [f"`{shortcut}` → `{command}`" for shortcut, command in results]
@@ -733,6 +3054,47 @@ async def alias_list(ctx):
     else:
         await ctx.send("No aliases configured.")
 
+duration_units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def parse_duration(value):
+    value = value.lower()
+    if not re.fullmatch(r"(?:\d+[smhdw])+", value):
+        return None
+    return sum(int(amount) * duration_units[unit] for amount, unit in re.findall(r"(\d+)([smhdw])", value)) or None
+
+def split_duration(reason):
+    first, _, rest = reason.partition(" ")
+    seconds = parse_duration(first)
+    if seconds is None:
+        return None, None, reason
+    return seconds, first.lower(), rest.strip() or "No reason provided"
+
+@bot.timers.handler("unmute")
+async def expire_mute(guild_id, channel_id, user_id):
+    guild = bot.get_guild(guild_id)
+    result = await bot.db.fetchone("SELECT mute_role_id FROM moderation WHERE guild_id = ?", (guild_id,))
+    if not guild or not result:
+        return
+    
+    mute_role = guild.get_role(result[0])
+    if not mute_role:
+        return
+    
+    try:
+        member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return
+    await member.remove_roles(mute_role, reason="Mute expired")
+
+@bot.timers.handler("unban")
+async def expire_ban(guild_id, channel_id, user_id):
+    guild = bot.get_guild(guild_id)
+    if guild:
+        try:
+            await guild.unban(discord.Object(id=user_id), reason="Ban expired")
+        except discord.NotFound:
+            pass
+
 @bot.command()
 @commands.has_permissions(kick_members=True)
 async def kick(ctx, member: discord.Member, *, reason="No reason provided"):
@@ -746,9 +3108,15 @@ async def kick(ctx, member: discord.Member, *, reason="No reason provided"):
 @bot.command()
 @commands.has_permissions(ban_members=True)
 async def ban(ctx, member: discord.Member, *, reason="No reason provided"):
+    duration, label, reason = split_duration(reason)
     try:
         await member.ban(reason=reason)
-        embed = discord.Embed(title="Member Banned", description=f"**{member}** has been banned\nReason: {reason}", color=0xff0000)
+        await bot.timers.cancel("unban", ctx.guild.id, member.id)
+        if duration:
+            await bot.timers.schedule(duration, "unban", ctx.guild.id, ctx.channel.id, member.id)
+        
+        length = f" for {label}" if duration else ""
+        embed = discord.Embed(title="Member Banned", description=f"**{member}** has been banned{length}\nReason: {reason}", color=0xff0000)
         await ctx.send(embed=embed)
     except discord.Forbidden:
         await ctx.send("I don't have permission to ban this member!")
@@ -768,11 +3136,7 @@ async def timeout(ctx, member: discord.Member, duration: int, *, reason="No reas
 @bot.command()
 @commands.has_permissions(manage_messages=True)
 async def mute(ctx, member: discord.Member, *, reason="No reason provided"):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT mute_role_id FROM moderation WHERE guild_id = ?", (ctx.guild.id,))
-    result = cursor.fetchone()
-    conn.close()
+    result = await bot.db.fetchone("SELECT mute_role_id FROM moderation WHERE guild_id = ?", (ctx.guild.id,))
     
     if not result:
         return await ctx.send("No mute role configured! Use `setupmute` first.")
@@ -781,9 +3145,15 @@ async def mute(ctx, member: discord.Member, *, reason="No reason provided"):
     if not mute_role:
         return await ctx.send("Mute role not found!")
     
+    duration, label, reason = split_duration(reason)
     try:
         await member.add_roles(mute_role, reason=reason)
-        embed = discord.Embed(title="Member Muted", description=f"**{member}** has been muted\nReason: {reason}", color=0xff0000)
+        await bot.timers.cancel("unmute", ctx.guild.id, member.id)
+        if duration:
+            await bot.timers.schedule(duration, "unmute", ctx.guild.id, ctx.channel.id, member.id)
+        
+        length = f" for {label}" if duration else ""
+        embed = discord.Embed(title="Member Muted", description=f"**{member}** has been muted{length}\nReason: {reason}", color=0xff0000)
         await ctx.send(embed=embed)
     except discord.Forbidden:
         await ctx.send("I don't have permission to mute this member!")
@@ -791,11 +3161,7 @@ async def mute(ctx, member: discord.Member, *, reason="No reason provided"):
 @bot.command()
 @commands.has_permissions(manage_messages=True)
 async def unmute(ctx, member: discord.Member):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT mute_role_id FROM moderation WHERE guild_id = ?", (ctx.guild.id,))
-    result = cursor.fetchone()
-    conn.close()
+    result = await bot.db.fetchone("SELECT mute_role_id FROM moderation WHERE guild_id = ?", (ctx.guild.id,))
     
     if not result:
         return await ctx.send("No mute role configured!")
@@ -806,22 +3172,73 @@ async def unmute(ctx, member: discord.Member):
     
     try:
         await member.remove_roles(mute_role)
+        await bot.timers.cancel("unmute", ctx.guild.id, member.id)
         embed = discord.Embed(title="Member Unmuted", description=f"**{member}** has been unmuted", color=0x00ff00)
         await ctx.send(embed=embed)
     except discord.Forbidden:
         await ctx.send("I don't have permission to unmute this member!")
 
+def guild_owner_only():
+    async def predicate(ctx):
+        return ctx.guild is not None and ctx.author.id == ctx.guild.owner_id
+    return commands.check(predicate)
+
+@bot.group(name='antinuke', invoke_without_command=True)
+@guild_owner_only()
+async def antinuke_group(ctx):
+    config = await bot.get_antinuke_config(ctx.guild.id)
+    
+    limits = "\n".join(f"`{action}`: {threshold} per {bot.action_timeframe}s" for action, threshold in config.limits.items())
+    whitelist = ", ".join(f"<@{user_id}>" for user_id in config.whitelist) or "Nobody"
+    
+    embed = discord.Embed(title="Anti-Nuke Settings", color=0x2f3136)
+    embed.add_field(name="Limits", value=limits, inline=False)
+    embed.add_field(name="Whitelist", value=whitelist, inline=False)
+    embed.set_footer(text="Use antinuke limit, antinuke whitelist, or antinuke unwhitelist")
+    await ctx.send(embed=embed)
+
+@antinuke_group.command(name='limit')
+@guild_owner_only()
+async def antinuke_limit(ctx, action, threshold: int):
+    if action not in bot.action_limits:
+        return await ctx.send(f"Action must be one of: {', '.join(bot.action_limits)}")
+    
+    if not 1 <= threshold <= 50:
+        return await ctx.send("Threshold must be between 1-50!")
+    
+    await bot.db.execute("INSERT OR REPLACE INTO antinuke_limits (guild_id, action, threshold) VALUES (?, ?, ?)", 
+                         (ctx.guild.id, action, threshold))
+    bot.antinuke_configs.pop(ctx.guild.id, None)
+    
+    embed = discord.Embed(title="Anti-Nuke Limit Updated", description=f"`{action}`: {threshold} per {bot.action_timeframe}s", color=0x00ff00)
+    await ctx.send(embed=embed)
+
+@antinuke_group.command(name='whitelist')
+@guild_owner_only()
+async def antinuke_whitelist(ctx, member: discord.Member):
+    await bot.db.execute("INSERT OR REPLACE INTO antinuke_whitelist (guild_id, user_id) VALUES (?, ?)", 
+                         (ctx.guild.id, member.id))
+    bot.antinuke_configs.pop(ctx.guild.id, None)
+    
+    embed = discord.Embed(title="Anti-Nuke Whitelist", description=f"{member.mention} is now whitelisted", color=0x00ff00)
+    await ctx.send(embed=embed)
+
+@antinuke_group.command(name='unwhitelist')
+@guild_owner_only()
+async def antinuke_unwhitelist(ctx, member: discord.Member):
+    await bot.db.execute("DELETE FROM antinuke_whitelist WHERE guild_id = ? AND user_id = ?", 
+                         (ctx.guild.id, member.id))
+    bot.antinuke_configs.pop(ctx.guild.id, None)
+    
+    embed = discord.Embed(title="Anti-Nuke Whitelist", description=f"{member.mention} is no longer whitelisted", color=0x00ff00)
+    await ctx.send(embed=embed)
+
 @bot.command()
 async def rank(ctx, member: discord.Member = None):
     if member is None:
         member = ctx.author
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT xp, level FROM levels WHERE guild_id = ? AND user_id = ?", 
-                   (ctx.guild.id, member.id))
-    result = cursor.fetchone()
+    result = await bot.get_xp(ctx.guild.id, member.id)
     
     if not result:
         embed = discord.Embed(title="No Data", description=f"{member.mention} hasn't gained any XP yet!", color=0xff0000)
@@ -829,11 +3246,8 @@ async def rank(ctx, member: discord.Member = None):
     
     xp, level = result
     
-    cursor.execute("SELECT COUNT(*) FROM levels WHERE guild_id = ? AND xp > ?", 
-                   (ctx.guild.id, xp))
-    rank = cursor.fetchone()[0] + 1
-    
-    conn.close()
+    index = await bot.get_level_index(ctx.guild.id)
+    rank = index.rank(xp)
     
     xp_for_current = bot.xp_for_level(level)
     xp_for_next = bot.xp_for_level(level + 1)
@@ -849,68 +3263,107 @@ async def rank(ctx, member: discord.Member = None):
     await ctx.send(embed=embed)
 
 @bot.command()
-async def leaderboard(ctx):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
+async def leaderboard(ctx, page: int = 1):
+    index = await bot.get_level_index(ctx.guild.id)
     
-    cursor.execute("SELECT user_id, xp, level FROM levels WHERE guild_id = ? ORDER BY xp DESC LIMIT 10", 
-                   (ctx.guild.id,))
-    results = cursor.fetchall()
-    conn.close()
-    
-    if not results:
+    if not len(index):
         return await ctx.send("No leaderboard data available!")
     
+    page_size = bot.leaderboard_page_size
+    pages = (len(index) + page_size - 1) // page_size
+    page = max(1, min(page, pages))
+    start = (page - 1) * page_size
+    
+    results = index.page(start, page_size)
+    if results is None:
+        await bot.flush_xp()
+        boundary = index.xp_at(start)
+        results = await bot.db.fetchall("SELECT user_id, xp, level FROM levels WHERE guild_id = ? AND xp <= ? ORDER BY xp DESC, user_id DESC LIMIT ? OFFSET ?", 
+                                        (ctx.guild.id, boundary, page_size, start - index.count_above(boundary)))
+    
+    members = {}
+    missing = []
+    for user_id, _, _ in results:
+        member = ctx.guild.get_member(user_id)
+        if member:
+            members[user_id] = member
+        else:
+            missing.append(user_id)
+    
+    if missing:
+        try:
+            for member in await ctx.guild.query_members(user_ids=missing, limit=len(missing), cache=False):
+                members[member.id] = member
+        except (asyncio.TimeoutError, discord.HTTPException):
+            pass
+    
     embed = discord.Embed(title=f"{ctx.guild.name} Leaderboard", color=0x2f3136)
     
     leaderboard_text = ""
-    for i, (user_id, xp, level) in enumerate(results, 1):
-        user = bot.get_user(user_id)
-        if user:
-            leaderboard_text += f"{i}. **{user.display_name}** - Level {level} ({xp} XP)\n"
+    for i, (user_id, xp, level) in enumerate(results, start + 1):
+        name = members[user_id].display_name if user_id in members else f"Unknown User ({user_id})"
+        leaderboard_text += f"{i}. **{name}** - Level {level} ({xp} XP)\n"
     
     embed.description = leaderboard_text
+    embed.set_footer(text=f"Page {page}/{pages} • {len(index)} ranked members")
     await ctx.send(embed=embed)
 
-@bot.command()
-async def snipe(ctx, channel: discord.TextChannel = None):
+async def send_snipe(ctx, channel, message_type, index):
     if channel is None:
         channel = ctx.channel
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT author_id, content, timestamp, message_type FROM sniped_messages WHERE guild_id = ? AND channel_id = ? ORDER BY timestamp DESC LIMIT 1", 
-                   (ctx.guild.id, channel.id))
-    result = cursor.fetchone()
-    conn.close()
+    entries = bot.snipes.get(channel.id, message_type)
     
-    if not result:
+    if not entries:
         return await ctx.send("No sniped messages found!")
     
-    author_id, content, timestamp, message_type = result
-    author = bot.get_user(author_id)
+    if not 1 <= index <= len(entries):
+        return await ctx.send(f"Only {len(entries)} sniped messages available!")
+    
+    entry = entries[index - 1]
+    author = bot.get_user(entry.author_id)
     
     embed = discord.Embed(
         title=f"Sniped Message ({message_type})",
-        description=content,
+        description=entry.content,
         color=0xff0000,
-        timestamp=datetime.fromisoformat(timestamp)
+        timestamp=entry.timestamp
     )
+    embed.set_footer(text=f"{index}/{len(entries)}")
     
     if author:
         embed.set_author(name=author.display_name, icon_url=author.display_avatar.url)
     
     await ctx.send(embed=embed)
 
+@bot.command()
+async def snipe(ctx, index: Optional[int] = 1, channel: discord.TextChannel = None):
+    await send_snipe(ctx, channel, "deleted", index)
+
+@bot.command()
+async def editsnipe(ctx, index: Optional[int] = 1, channel: discord.TextChannel = None):
+    await send_snipe(ctx, channel, "edited", index)
+
+@bot.command()
+@commands.has_permissions(manage_messages=True)
+async def clearsnipe(ctx, channel: discord.TextChannel = None):
+    if channel is None:
+        channel = ctx.channel
+    
+    bot.snipes.clear(channel.id)
+    if bot.snipe_persist:
+        bot.snipe_pending = [row for row in bot.snipe_pending if row[1] != channel.id]
+        await bot.db.execute("DELETE FROM sniped_messages WHERE guild_id = ? AND channel_id = ?", 
+                             (ctx.guild.id, channel.id))
+    
+    await ctx.send(f"🧹 Cleared sniped messages for {channel.mention}")
+
 @bot.command()
 @commands.has_permissions(manage_channels=True)
 async def starboard(ctx, channel: discord.TextChannel, threshold: int = 3):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO starboard (guild_id, channel_id, threshold) VALUES (?, ?, ?)", 
-                   (ctx.guild.id, channel.id, threshold))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("INSERT OR REPLACE INTO starboard (guild_id, channel_id, threshold) VALUES (?, ?, ?)", 
+                         (ctx.guild.id, channel.id, threshold))
+    bot.starboard_configs[ctx.guild.id] = (channel.id, threshold)
     
     embed = discord.Embed(title="Starboard Setup", 
                          description=f"Starboard channel: {channel.mention}\nThreshold: {threshold} ⭐", 
@@ -923,28 +3376,38 @@ async def autorespond_group(ctx):
 
 @autorespond_group.command(name='add')
 @commands.has_permissions(manage_guild=True)
-async def autorespond_add(ctx, trigger, *, response):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO autoresponders (guild_id, trigger, response) VALUES (?, ?, ?)", 
-                   (ctx.guild.id, trigger, response))
-    conn.commit()
-    conn.close()
+async def autorespond_add(ctx, trigger, *, response_and_flags):
+    match_mode = "contains"
+    response = response_and_flags
+    
+    if '--match' in response_and_flags:
+        parts = response_and_flags.split('--match')
+        response = parts[0].strip()
+        match_mode = parts[1].strip().lower()
+    
+    if match_mode not in AutoResponderMatcher.MODES:
+        return await ctx.send(f"Match mode must be one of: {', '.join(AutoResponderMatcher.MODES)}")
+    
+    if match_mode == "regex":
+        error = AutoResponderMatcher.check_regex(trigger)
+        if error:
+            return await ctx.send(error)
+    
+    await bot.db.execute("INSERT OR REPLACE INTO autoresponders (guild_id, trigger, response, match_mode) VALUES (?, ?, ?, ?)", 
+                         (ctx.guild.id, trigger, response, match_mode))
+    bot.autoresponders.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Auto-Responder Added", 
-                         description=f"Trigger: `{trigger}`\nResponse: `{response}`", 
+                         description=f"Trigger: `{trigger}`\nResponse: `{response}`\nMatch: {match_mode}", 
                          color=0x00ff00)
     await ctx.send(embed=embed)
 
 @autorespond_group.command(name='remove')
 @commands.has_permissions(manage_guild=True)
 async def autorespond_remove(ctx, trigger):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM autoresponders WHERE guild_id = ? AND trigger = ?", 
-                   (ctx.guild.id, trigger))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("DELETE FROM autoresponders WHERE guild_id = ? AND trigger = ?", 
+                         (ctx.guild.id, trigger))
+    bot.autoresponders.pop(ctx.guild.id, None)
     
     embed = discord.Embed(title="Auto-Responder Removed", 
                          description=f"Removed trigger: `{trigger}`", 
@@ -953,14 +3416,10 @@ async def autorespond_remove(ctx, trigger):
 
 @autorespond_group.command(name='list')
 async def autorespond_list(ctx):
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT trigger, response FROM autoresponders WHERE guild_id = ?", (ctx.guild.id,))
-    results = cursor.fetchall()
-    conn.close()
+    results = await bot.db.fetchall("SELECT trigger, response, match_mode FROM autoresponders WHERE guild_id = ? ORDER BY rowid", (ctx.guild.id,))
     
     if results:
-        responder_list = [f"`{trigger}` → `{response}`" for trigger, response in results]
+        responder_list = [f"`{trigger}` → `{response}` ({match_mode})" for trigger, response, match_mode in results]
         embed = discord.Embed(title="Auto-Responders", description="\n".join(responder_list), color=0x2f3136)
         await ctx.send(embed=embed)
     else:
@@ -976,12 +3435,8 @@ async def voicemaster(ctx, category: discord.CategoryChannel):
     
     join_channel = await category.create_voice_channel("➕ Join to Create", overwrites=overwrites)
     
-    conn = sqlite3.connect(bot.db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO voicemaster (guild_id, category_id, channel_id) VALUES (?, ?, ?)", 
-                   (ctx.guild.id, category.id, join_channel.id))
-    conn.commit()
-    conn.close()
+    await bot.db.execute("INSERT OR REPLACE INTO voicemaster (guild_id, category_id, channel_id) VALUES (?, ?, ?)", 
+                         (ctx.guild.id, category.id, join_channel.id))
     
     embed = discord.Embed(title="VoiceMaster Setup", 
                          description=f"Join channel: {join_channel.mention}\nCategory: {category.mention}", 
@@ -990,12 +3445,10 @@ async def voicemaster(ctx, category: discord.CategoryChannel):
 
 @bot.event
 async def on_voice_state_update(member, before, after):
+    await music_players.on_voice_state_update(member, before, after)
+    
     if after.channel:
-        conn = sqlite3.connect(bot.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT category_id, channel_id FROM voicemaster WHERE guild_id = ?", (member.guild.id,))
-        result = cursor.fetchone()
-        conn.close()
+        result = await bot.db.fetchone("SELECT category_id, channel_id FROM voicemaster WHERE guild_id = ?", (member.guild.id,))
         
         if result and after.channel.id == result[1]:
             category = member.guild.get_channel(result[0])
@@ -1008,19 +3461,84 @@ async def on_voice_state_update(member, before, after):
         if len(before.channel.members) == 0:
             await before.channel.delete()
 
+@bot.command()
+@commands.is_owner()
+async def stats(ctx):
+    clusters = sorted(await bot.cluster_stats(), key=lambda cluster: cluster['cluster'])
+    
+    embed = discord.Embed(title="Bot Stats", color=0x2f3136)
+    embed.add_field(name="Guilds", value=sum(cluster['guilds'] for cluster in clusters))
+    embed.add_field(name="Shards", value=sum(cluster['shards'] for cluster in clusters))
+    embed.add_field(name="Players", value=sum(cluster['players'] for cluster in clusters))
+    embed.add_field(name="Commands", value=sum(cluster['commands'] for cluster in clusters))
+    embed.add_field(name="Command Errors", value=sum(cluster['errors'] for cluster in clusters))
+    embed.add_field(name="Outbound Queue", value=sum(cluster['queue_depth'] for cluster in clusters))
+    embed.add_field(name="Clusters", value="\n".join(
+        f"`{cluster['cluster']}`: {cluster['guilds']} guilds, {cluster['latency'] * 1000:.0f}ms" for cluster in clusters), inline=False)
+    
+    channels = sorted(bot.outbound.stats().items(), key=lambda item: (item[1]['depth'], item[1]['dropped']), reverse=True)[:5]
+    if channels and (channels[0][1]['depth'] or channels[0][1]['dropped']):
+        embed.add_field(name="Busiest Outbound Channels (this cluster)", value="\n".join(
+            f"<#{channel_id}>: {stats['depth']} queued, {stats['dropped']} dropped, {(stats['latency'] or 0) * 1000:.0f}ms" 
+            for channel_id, stats in channels), inline=False)
+    
+    for title, name in (("Slowest Commands", "bleed_command_seconds"), ("Slowest Events", "bleed_event_seconds"), ("Database", "bleed_db_seconds")):
+        series = sorted(metrics.histograms.get(name, {}).items(), key=lambda item: item[1].quantile(0.95), reverse=True)[:5]
+        if series:
+            embed.add_field(name=f"{title} (p95, this cluster)", value="\n".join(
+                f"`{labels[0][1]}`: {histogram.quantile(0.95) * 1000:.0f}ms over {histogram.count} calls" for labels, histogram in series), inline=False)
+    await ctx.send(embed=embed)
+
 @bot.command()
 async def help(ctx, *, command=None):
     if command is None:
         embed = discord.Embed(title="Bleed Bot Commands", color=0x2f3136)
         embed.add_field(name="General", value="`prefix`, `help`", inline=False)
-        embed.add_field(name="Moderation", value="`setup`, `setupmute`, `bind`, `kick`, `ban`, `mute`, `unmute`, `timeout`", inline=False)
+        embed.add_field(name="Moderation", value="`setup`, `setupmute`, `bind`, `kick`, `ban`, `mute`, `unmute`, `timeout`, `antinuke`", inline=False)
         embed.add_field(name="System Messages", value="`welcome`, `goodbye`, `boost`", inline=False)
-        embed.add_field(name="Music", value="`play`, `queue`, `skip`, `pause`, `resume`, `volume`", inline=False)
+        embed.add_field(name="Music", value="`play`, `queue`, `skip`, `pause`, `resume`, `stop`, `leave`, `seek`, `volume`, `repeat`, `preset`, `settings`", inline=False)
         embed.add_field(name="Aliases", value="`alias add/remove/view/list`", inline=False)
         embed.add_field(name="Leveling", value="`rank`, `leaderboard`", inline=False)
-        embed.add_field(name="Other", value="`snipe`, `starboard`, `autorespond`, `voicemaster`", inline=False)
+        embed.add_field(name="Other", value="`snipe`, `editsnipe`, `clearsnipe`, `starboard`, `autorespond`, `voicemaster`", inline=False)
         embed.description = "Use `help <command>` for detailed information about a specific command."
         await ctx.send(embed=embed)
 
+async def fetch_shard_count(token):
+    async with aiohttp.ClientSession() as session:
+        async with session.get("https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())['shards']
+
+async def launch_cluster(token, clusters, shard_count=None, host="127.0.0.1", port=7020):
+    shard_count = shard_count or await fetch_shard_count(token)
+    per_cluster = -(-shard_count // max(1, min(clusters, shard_count)))
+    clusters = -(-shard_count // per_cluster)
+    
+    hub = ClusterHub()
+    server = await asyncio.start_server(hub.handle, host, port)
+    processes = []
+    for cluster_id in range(clusters):
+        shard_ids = range(cluster_id * per_cluster, min((cluster_id + 1) * per_cluster, shard_count))
+        print(f"Starting cluster {cluster_id} with shards {shard_ids.start}-{shard_ids.stop - 1} of {shard_count}")
+        processes.append(await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--cluster-worker", str(cluster_id), str(clusters),
+            ",".join(map(str, shard_ids)), str(shard_count), f"{host}:{port}"))
+    
+    async with server:
+        await asyncio.gather(*(process.wait() for process in processes))
+
 if __name__ == "__main__":
-    bot.run('Bot token goes here :D')
\ No newline at end of file
+    token = 'Bot token goes here :D'
+    if len(sys.argv) == 3 and sys.argv[1] == "--audio-worker":
+        host, port = sys.argv[2].rsplit(":", 1)
+        asyncio.run(AudioWorker(host, int(port), audio_token).serve())
+    elif len(sys.argv) in (3, 4) and sys.argv[1] == "--cluster":
+        asyncio.run(launch_cluster(token, int(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) == 4 else None))
+    elif len(sys.argv) == 7 and sys.argv[1] == "--cluster-worker":
+        cluster_id, cluster_count, shard_ids, shard_count, address = sys.argv[2:]
+        host, port = address.rsplit(":", 1)
+        bot.configure_cluster(int(cluster_id), int(cluster_count), [int(shard_id) for shard_id in shard_ids.split(",")], 
+                              int(shard_count), (host, int(port)))
+        bot.run(token)
+    else:
+        bot.run(token)
\ No newline at end of file